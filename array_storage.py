@@ -0,0 +1,40 @@
+import tempfile
+import numpy as np
+
+
+# Chunk size used when a swarm is stored on disk and no chunk_size is given.  Large enough that looping over chunks
+# costs little, small enough that a chunk's temporary arrays take a few tens of megabytes
+default_chunk_size = 2 ** 16
+
+
+def create_array(shape, dtype=np.double, directory=None):
+    """
+    Creates a zero filled array, in memory or memory-mapped from a temporary file in directory.  Memory-mapped arrays
+    are only paged into memory while they are being used, so swarms larger than memory can be stored as long as they
+    are processed a chunk at a time.  The file is removed from directory as soon as it is created and its space is freed
+    once the array is no longer used, so runs sharing a directory never see each other's files.
+
+    Parameters
+    ----------
+    shape: tuple of ints
+    dtype: np.dtype of the array
+    directory: str containing the directory to store the array in, or None to keep it in memory
+
+    Returns
+    -------
+    np.ndarray or np.memmap
+    """
+    if directory is None or np.prod(shape) == 0:
+        return np.zeros(shape, dtype=dtype)
+
+    with tempfile.TemporaryFile(dir=directory) as storage_file:
+        return np.memmap(storage_file, dtype=dtype, mode="w+", shape=shape)
+
+
+def find_chunks(num_items, chunk_size=None):
+    """
+    Yields slices of at most chunk_size items covering range(num_items) in order, in one slice if chunk_size is None
+    """
+    chunk_size = max(1, num_items) if chunk_size is None else chunk_size
+    for start in range(0, num_items, chunk_size):
+        yield slice(start, min(start + chunk_size, num_items))
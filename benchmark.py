@@ -0,0 +1,235 @@
+# Author: Julian Pryde
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+from benchmark_functions import benchmark_functions
+from main import optimize
+from swarm import Swarm
+import kernels
+
+
+# Arguments shared by every benchmark case, in the format of the arguments file
+default_arguments = {
+    "function": "min",
+    "local_radius_limit": 0.1,
+    "velocity_coefficient": 0.01,
+    "initial_sigma": 0.01,
+    "most_movement_exit_criterion": 0.000001,
+    "r2_exit_criterion": 1,
+    "annealing_lifetime": 300,
+    "iteration_limit": 300,
+    "velocity_update_method": "gradient",
+    "least_squares_method": "direct",
+    "min_local_radius_limit": 0.01,
+    "evaluation_mode": "batched",
+    "evaluation_executor": "serial",
+}
+
+# Keys of default_arguments which main.optimize reads, the rest are given to the swarm
+optimization_argument_keys = ("function", "most_movement_exit_criterion", "r2_exit_criterion", "iteration_limit")
+
+
+class TargetTracker:
+    """
+    Records the best score seen during a run and the iteration, forcing function evaluations, and time at which the
+    run first gets within target_error of the function's minimum.  Passed to main.optimize as its iteration_callback.
+    """
+
+    def __init__(self, minimum, target_error, start_time):
+        self.target_score = minimum + target_error
+        self.start_time = start_time
+        self.best_score = np.inf
+        self.iteration = None
+        self.num_evaluations = None
+        self.time = None
+
+    def check(self, particle_swarm, iteration):
+        self.best_score = min(self.best_score, particle_swarm.best_particle.score)
+        if self.iteration is None and particle_swarm.best_particle.score <= self.target_score:
+            self.iteration = iteration
+            self.num_evaluations = particle_swarm.evaluator.num_evaluations
+            self.time = time.perf_counter() - self.start_time
+
+
+def create_case_arguments(function_name, num_dimensions, num_particles, iteration_limit, seed, dtype="float64"):
+    """
+    Returns
+    -------
+    optimization_arguments, swarm_arguments: dictionaries as made by InputHandling for one benchmark case
+    """
+    arguments = dict(default_arguments,
+                     limits=benchmark_functions[function_name].create_limits(num_dimensions),
+                     num_particles=num_particles,
+                     iteration_limit=iteration_limit,
+                     seed=seed,
+                     dtype=dtype)
+    optimization_arguments = {key: arguments[key] for key in optimization_argument_keys}
+    swarm_arguments = {key: value for key, value in arguments.items() if key not in optimization_argument_keys}
+    return optimization_arguments, swarm_arguments
+
+
+def run_case(function_name, num_dimensions, num_particles, iteration_limit, target_error, seed, dtype="float64",
+             memory_iterations=10):
+    """
+    Runs one benchmark case twice from the same seed: once timed, and once for memory_iterations iterations under
+    tracemalloc to find the peak memory allocated, which would otherwise slow down the timed run.
+
+    Returns
+    -------
+    dictionary of python data types containing the results of the case
+    """
+    benchmark_function = benchmark_functions[function_name]
+    optimization_arguments, swarm_arguments = create_case_arguments(function_name, num_dimensions, num_particles,
+                                                                    iteration_limit, seed, dtype)
+
+    particle_swarm = Swarm(swarm_arguments, benchmark_function.objective)
+    start_time = time.perf_counter()
+    target_tracker = TargetTracker(benchmark_function.minimum, target_error, start_time)
+    _, _, iterations = optimize(particle_swarm, optimization_arguments, swarm_arguments, verbose=False,
+                                iteration_callback=target_tracker.check)
+    wall_time = time.perf_counter() - start_time
+    particle_swarm.evaluator.shutdown()
+    # Positions scored from the evaluation cache are not counted as evaluations
+    num_evaluations = particle_swarm.evaluator.num_evaluations
+    cache_hits = particle_swarm.evaluator.cache.hits if particle_swarm.evaluator.cache is not None else 0
+
+    tracemalloc.start()
+    memory_swarm = Swarm(swarm_arguments, benchmark_function.objective)
+    optimize(memory_swarm, dict(optimization_arguments, iteration_limit=min(memory_iterations, iteration_limit)),
+             swarm_arguments, verbose=False)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    memory_swarm.evaluator.shutdown()
+
+    return {
+        "function": function_name,
+        "num_dimensions": num_dimensions,
+        "num_particles": num_particles,
+        "dtype": dtype,
+        "seed": seed,
+        "iterations": int(iterations),
+        "wall_time": wall_time,
+        "time_per_iteration": wall_time / iterations if iterations else None,
+        "evaluations": int(num_evaluations),
+        "evaluations_per_second": num_evaluations / wall_time if wall_time > 0 else None,
+        "cache_hits": int(cache_hits),
+        "final_best_score": float(particle_swarm.best_particle.score),
+        "best_score": float(target_tracker.best_score),
+        "error": float(target_tracker.best_score - benchmark_function.minimum),
+        "target_error": target_error,
+        "iterations_to_target": target_tracker.iteration,
+        "evaluations_to_target": target_tracker.num_evaluations,
+        "time_to_target": target_tracker.time,
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def find_git_revision():
+    """
+    Returns
+    -------
+    str describing the checked out git commit, or None when not run from a git checkout
+    """
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure_startup_time(module, repeats=5):
+    """
+    Times a new python interpreter importing module from this directory, which is what running the module as a script
+    costs before any work begins.  The fastest of repeats runs is taken to leave out disk cache misses.
+
+    Returns
+    -------
+    float containing the startup time in seconds, or None if module could not be imported
+    """
+    startup_times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-c", "import " + module], capture_output=True,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)))
+        startup_times.append(time.perf_counter() - start_time)
+        if completed.returncode != 0:
+            return None
+
+    return min(startup_times)
+
+
+def run_benchmarks(function_names, dimensions, particle_counts, iteration_limit, target_error, seed,
+                   dtypes=("float64",)):
+    """
+    Runs every combination of function, number of dimensions, number of particles, and dtype, skipping functions
+    which are only defined for other numbers of dimensions.  The kernels used are recorded as the backend, set
+    PSO_KERNELS to "python" to benchmark the pure python kernels when the compiled ones are built.
+
+    Returns
+    -------
+    dictionary of python data types containing a description of the machine and the results of every case
+    """
+    # An interpreter which imports nothing, to tell the time spent importing the optimizer from python's own startup
+    interpreter_startup_time = measure_startup_time("sys")
+    startup_time = measure_startup_time("main")
+    print("Startup: {} s for main.py, {} s for the interpreter alone".format(startup_time, interpreter_startup_time))
+    cases = []
+    for function_name in function_names:
+        for num_dimensions in dimensions:
+            if benchmark_functions[function_name].num_dimensions not in (None, num_dimensions):
+                continue
+            for num_particles in particle_counts:
+                for dtype in dtypes:
+                    case = run_case(function_name, num_dimensions, num_particles, iteration_limit, target_error, seed,
+                                    dtype)
+                    print("{:>16} {:>4}D {:>7} particles {:>7}: {:10.3e} s/iteration, {:10.3e} evaluations/s, "
+                          "{:10d} bytes peak, error {:.3e}"
+                          .format(function_name, num_dimensions, num_particles, dtype, case["time_per_iteration"],
+                                  case["evaluations_per_second"], case["peak_memory_bytes"], case["error"]))
+                    cases.append(case)
+
+    return {
+        "backend": kernels.backend,
+        "git_revision": find_git_revision(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python_version": platform.python_version(),
+        "numpy_version": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "iteration_limit": iteration_limit,
+        "interpreter_startup_time": interpreter_startup_time,
+        "startup_time": startup_time,
+        "cases": cases,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the optimizer on standard test functions")
+    parser.add_argument("--functions", nargs="+", choices=list(benchmark_functions), default=list(benchmark_functions))
+    parser.add_argument("--dimensions", nargs="+", type=int, default=[2, 5, 10])
+    parser.add_argument("--particles", nargs="+", type=int, default=[50, 200, 500])
+    parser.add_argument("--dtypes", nargs="+", choices=["float64", "float32"], default=["float64", "float32"],
+                        help="Precisions the swarm is stored in")
+    parser.add_argument("--iterations", type=int, default=300, help="Iteration limit of each case")
+    parser.add_argument("--target-error", type=float, default=1e-2,
+                        help="Distance from the minimum score counted as reaching the target")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", metavar="JSON_FILE", default="benchmark_results.json")
+    command_line_arguments = parser.parse_args()
+    results = run_benchmarks(command_line_arguments.functions,
+                             command_line_arguments.dimensions,
+                             command_line_arguments.particles,
+                             command_line_arguments.iterations,
+                             command_line_arguments.target_error,
+                             command_line_arguments.seed,
+                             command_line_arguments.dtypes)
+    with open(command_line_arguments.output, "w") as output_file:
+        json.dump(results, output_file, indent=4)
+    print("Results saved to " + command_line_arguments.output)
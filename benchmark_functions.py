@@ -0,0 +1,77 @@
+import numpy as np
+from forcing_function import forcing_function
+
+
+# Standard test functions for benchmark.py.  Like forcing_function, each takes positions indexable by dimension, where
+# each element is a scalar, an (num_particles) size array when the whole swarm is scored at once, or a meshgrid array,
+# and returns scores with the shape of one element.  All have a global minimum of 0.
+
+
+def sphere(particle_positions):
+    x = np.asarray(particle_positions, dtype=np.double)
+    return np.sum(x ** 2, axis=0)
+
+
+def rosenbrock(particle_positions):
+    x = np.asarray(particle_positions, dtype=np.double)
+    return np.sum(100 * (x[1:] - x[:-1] ** 2) ** 2 + (1 - x[:-1]) ** 2, axis=0)
+
+
+def rastrigin(particle_positions):
+    x = np.asarray(particle_positions, dtype=np.double)
+    return 10 * len(x) + np.sum(x ** 2 - 10 * np.cos(2 * np.pi * x), axis=0)
+
+
+def ackley(particle_positions):
+    x = np.asarray(particle_positions, dtype=np.double)
+    return -20 * np.exp(-0.2 * np.sqrt(np.mean(x ** 2, axis=0))) - np.exp(np.mean(np.cos(2 * np.pi * x), axis=0)) + \
+        20 + np.e
+
+
+def griewank(particle_positions):
+    x = np.asarray(particle_positions, dtype=np.double)
+    divisors = np.sqrt(np.arange(1, len(x) + 1)).reshape((-1,) + (1,) * (x.ndim - 1))
+    return 1 + np.sum(x ** 2, axis=0) / 4000 - np.prod(np.cos(x / divisors), axis=0)
+
+
+class BenchmarkFunction:
+    """
+    A test function with the search domain and minimum it is benchmarked with.
+    """
+
+    def __init__(self, objective, lower_limit, upper_limit, minimum, num_dimensions=None):
+        """
+        self.objective: forcing function
+
+        self.lower_limit, self.upper_limit: np.double limits of the search domain, the same in every dimension
+
+        self.minimum: np.double containing the global minimum score
+
+        self.num_dimensions: int containing the only number of dimensions the function is defined for, or None if it
+            is defined for any number
+        """
+        self.objective = objective
+        self.lower_limit = lower_limit
+        self.upper_limit = upper_limit
+        self.minimum = minimum
+        self.num_dimensions = num_dimensions
+
+    def create_limits(self, num_dimensions):
+        """
+        Returns
+        -------
+        (num_dimensions, 2) size np.ndarray of limits in the format of the limits argument
+        """
+        return np.tile([self.lower_limit, self.upper_limit], (num_dimensions, 1)).astype(np.double)
+
+
+benchmark_functions = {
+    "sphere": BenchmarkFunction(sphere, -5.12, 5.12, 0.0),
+    "rosenbrock": BenchmarkFunction(rosenbrock, -5.0, 10.0, 0.0),
+    "rastrigin": BenchmarkFunction(rastrigin, -5.12, 5.12, 0.0),
+    "ackley": BenchmarkFunction(ackley, -32.768, 32.768, 0.0),
+    "griewank": BenchmarkFunction(griewank, -600.0, 600.0, 0.0),
+    # Minimum of 2 * sqrt(2) / 5 at x = y = 1 / sqrt(2).  The lower limit is kept clear of the pole at 0, since the
+    # randomness factor can move particles slightly outside the limits
+    "forcing_function": BenchmarkFunction(forcing_function, 0.5, 10.0, 2 * np.sqrt(2) / 5, num_dimensions=2),
+}
@@ -0,0 +1,166 @@
+# Author: Julian Pryde
+import argparse
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+import kernels_py
+from neighbor_search import CellGrid, build_neighbor_list
+
+
+def compare(name, python_result, compiled_result, tolerance):
+    """
+    Returns
+    -------
+    bool, True if every array of both results has the same shape, type, and values within tolerance
+    """
+    python_arrays = python_result if isinstance(python_result, tuple) else (python_result,)
+    compiled_arrays = compiled_result if isinstance(compiled_result, tuple) else (compiled_result,)
+    matches = all(np.shape(python_array) == np.shape(compiled_array) and
+                  np.result_type(python_array) == np.result_type(compiled_array) and
+                  np.allclose(python_array, compiled_array, rtol=tolerance, atol=tolerance, equal_nan=True)
+                  for python_array, compiled_array in zip(python_arrays, compiled_arrays))
+    print("{:<32} {}".format(name, "ok" if matches else "MISMATCH"))
+    return matches
+
+
+def sort_pairs(pairs):
+    rows, columns = pairs
+    order = np.lexsort((columns, rows))
+    return rows[order], columns[order]
+
+
+def check_kernels(kernels_c, num_particles, num_dimensions, radius, seed, float_type, tolerance):
+    """
+    Runs every kernel of both modules on the same random swarm
+
+    Returns
+    -------
+    bool, True if every kernel gave the same result
+    """
+    rng = np.random.default_rng(seed)
+    positions = rng.random((num_particles, num_dimensions)).astype(float_type)
+    velocities = rng.normal(0, 0.5, positions.shape).astype(float_type)
+    scores = rng.normal(0, 1, num_particles).astype(float_type)
+    results = []
+
+    python_positions = positions.copy()
+    compiled_positions = positions.copy()
+    kernels_py.move_particles(python_positions, velocities)
+    kernels_c.move_particles(compiled_positions, velocities)
+    results.append(compare("move_particles", python_positions, compiled_positions, tolerance))
+
+    shaken_positions = positions + rng.normal(0, 0.01, positions.shape).astype(float_type)
+    results.append(compare("find_max_displacement", kernels_py.find_max_displacement(shaken_positions, positions),
+                           kernels_c.find_max_displacement(shaken_positions, positions), tolerance))
+
+    python_pairs = sort_pairs(kernels_py.find_pairs_brute_force(positions, radius))
+    results.append(compare("find_pairs_brute_force", python_pairs,
+                           sort_pairs(kernels_c.find_pairs_brute_force(positions, radius)), 0))
+
+    grid = CellGrid(positions, radius)
+    grid_arguments = (positions, grid.cell_coordinates, grid.cells_per_dimension, grid.sorted_particle_ids,
+                      grid.sorted_cell_ids, radius)
+    results.append(compare("find_pairs_in_cell_grid", python_pairs,
+                           sort_pairs(kernels_c.find_pairs_in_cell_grid(*grid_arguments)), 0))
+    results.append(compare("find_pairs_in_cell_grid (python)", python_pairs,
+                           sort_pairs(kernels_py.find_pairs_in_cell_grid(*grid_arguments)), 0))
+
+    # A chunk of rows, as searched for swarms stored on disk
+    particle_range = (num_particles // 3, 2 * num_particles // 3)
+    python_chunk_pairs = sort_pairs(kernels_py.find_pairs_brute_force(positions, radius, *particle_range))
+    results.append(compare("find_pairs_brute_force (chunk)", python_chunk_pairs,
+                           sort_pairs(kernels_c.find_pairs_brute_force(positions, radius, *particle_range)), 0))
+    results.append(compare("find_pairs_in_cell_grid (chunk)", python_chunk_pairs,
+                           sort_pairs(kernels_c.find_pairs_in_cell_grid(*grid_arguments, *particle_range)), 0))
+    results.append(compare("find_pairs_in_cell_grid (chunk, py)", python_chunk_pairs,
+                           sort_pairs(kernels_py.find_pairs_in_cell_grid(*grid_arguments, *particle_range)), 0))
+
+    particle_ids = np.arange(num_particles, dtype=np.intp)
+    rows, columns = np.repeat(particle_ids, num_particles), np.tile(particle_ids, num_particles)
+    results.append(compare("find_within_radius", kernels_py.find_within_radius(positions, rows, columns, radius),
+                           kernels_c.find_within_radius(positions, rows, columns, radius), 0))
+
+    neighbor_list = build_neighbor_list(*python_pairs, num_particles, radius)
+    for find_max in (False, True):
+        results.append(compare("find_best_neighbors" + (" (max)" if find_max else ""),
+                               kernels_py.find_best_neighbors(scores, neighbor_list.indptr, neighbor_list.indices,
+                                                              find_max),
+                               kernels_c.find_best_neighbors(scores, neighbor_list.indptr, neighbor_list.indices,
+                                                             find_max), 0))
+    python_differences = kernels_py.center_neighborhoods(positions, scores, neighbor_list.indptr,
+                                                         neighbor_list.indices)
+    results.append(compare("center_neighborhoods", python_differences,
+                           kernels_c.center_neighborhoods(positions, scores, neighbor_list.indptr,
+                                                          neighbor_list.indices), tolerance))
+    results.append(compare("accumulate_normal_equations",
+                           kernels_py.accumulate_normal_equations(*python_differences, neighbor_list.indptr),
+                           kernels_c.accumulate_normal_equations(*python_differences, neighbor_list.indptr),
+                           tolerance))
+    gradients = rng.normal(0, 1, (num_particles, num_dimensions))
+    results.append(compare("find_sum_squared_residuals",
+                           kernels_py.find_sum_squared_residuals(*python_differences, gradients, neighbor_list.indptr),
+                           kernels_c.find_sum_squared_residuals(*python_differences, gradients, neighbor_list.indptr),
+                           tolerance))
+    return all(results)
+
+
+def run_optimization(backend, config):
+    """
+    Runs config in a new interpreter using backend's kernels
+
+    Returns
+    -------
+    dictionary from optimizer.OptimizationResult.to_dict()
+    """
+    script = "import json, sys, optimizer; print(json.dumps(optimizer.optimize(json.load(sys.stdin)).to_dict()))"
+    completed = subprocess.run([sys.executable, "-c", script], input=json.dumps(config), capture_output=True, text=True,
+                               check=True, env=dict(os.environ, PSO_KERNELS=backend),
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(completed.stdout)
+
+
+def check_optimization(config, tolerance):
+    """
+    Runs the same seeded optimization with each backend.  Rounding differences between the backends grow from one
+    iteration to the next, so this is only meaningful for short runs.
+
+    Returns
+    -------
+    bool, True if both runs found the same best particle in the same number of iterations
+    """
+    python_result = run_optimization("python", config)
+    compiled_result = run_optimization("cython", config)
+    return compare("optimize", (np.array(python_result["best_position"]), python_result["best_score"],
+                                python_result["iterations"]),
+                   (np.array(compiled_result["best_position"]), compiled_result["best_score"],
+                    compiled_result["iterations"]), tolerance)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that the compiled kernels give the same results as the pure "
+                                                 "python kernels.  Build them first with "
+                                                 "`python setup.py build_ext --inplace`.")
+    parser.add_argument("--particles", type=int, default=500)
+    parser.add_argument("--dimensions", nargs="+", type=int, default=[2, 3, 5])
+    parser.add_argument("--radius", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=10, help="Iteration limit of the end to end comparison")
+    command_line_arguments = parser.parse_args()
+    import kernels_c
+
+    all_match = True
+    for dimensions in command_line_arguments.dimensions:
+        for float_type, tolerance in ((np.double, 1e-9), (np.single, 1e-4)):
+            print(str(dimensions) + " dimensions, " + np.dtype(float_type).name + ":")
+            all_match &= check_kernels(kernels_c, command_line_arguments.particles, dimensions,
+                                       command_line_arguments.radius, command_line_arguments.seed, float_type,
+                                       tolerance)
+
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "arguments")) as arguments_file:
+        end_to_end_config = dict(json.load(arguments_file), seed=command_line_arguments.seed,
+                                 iteration_limit=command_line_arguments.iterations)
+    print("End to end, " + str(command_line_arguments.iterations) + " iterations:")
+    all_match &= check_optimization(end_to_end_config, 1e-6)
+    sys.exit(0 if all_match else 1)
@@ -0,0 +1,201 @@
+import json
+import os
+import threading
+import zipfile
+import numpy as np
+from array_storage import create_array, find_chunks
+
+
+class CheckpointError(Exception):
+    pass
+
+
+def copy_swarm_array(state, array):
+    """
+    Copies array a chunk of particles at a time into a new array stored the same way as the swarm's arrays, so copying
+    a swarm stored on disk never holds more than one chunk of it in memory
+    """
+    array = np.asarray(array)
+    copy = state.create_array(array.shape, array.dtype)
+    for particles in state.find_chunks():
+        copy[particles] = array[particles]
+    return copy
+
+
+def capture_run_state(particle_swarm, iteration, iterations_with_same_best_particle_counter, mean_r_squared):
+    """
+    Copies everything needed to continue an optimization run from the end of an iteration.  Copying the swarm arrays is
+    all that happens on the optimization loop's thread, so the swarm can keep moving while the copy is written.  The
+    copies are stored like the swarm's arrays, on disk if the swarm has a storage directory.
+
+    Returns
+    -------
+    dictionary of np.ndarrays to be saved with write_checkpoint
+    """
+    previous_best_particle = particle_swarm.previous_best_particle
+    state = particle_swarm.state
+    return {
+        "limits": np.array(particle_swarm.limits),
+        "positions": copy_swarm_array(state, state.positions),
+        "velocities": copy_swarm_array(state, state.velocities),
+        "scores": copy_swarm_array(state, state.scores),
+        "r_squareds": copy_swarm_array(state, particle_swarm.r_squareds),
+        "best_particle_id": np.array(particle_swarm.best_particle.id),
+        "previous_best_particle_id": np.array(-1 if previous_best_particle is None else previous_best_particle.id),
+        "fastest_particle_id": np.array(particle_swarm.fastest_particle.id),
+        "sigma": np.array(particle_swarm.sigma),
+        "local_radius_limit": np.array(particle_swarm.local_radius_limit),
+        "velocity_coefficient": np.array(particle_swarm.velocity_coefficient),
+        "high_particle_velocity_counter": np.array(particle_swarm.high_particle_velocity_counter),
+        "evaluation_mode": np.array(particle_swarm.evaluator.evaluation_mode),
+        "iteration": np.array(iteration),
+        "iterations_with_same_best_particle_counter": np.array(iterations_with_same_best_particle_counter),
+        "mean_r_squared": np.array(mean_r_squared),
+        "rng_state": np.array(json.dumps(particle_swarm.state.rng.bit_generator.state)),
+    }
+
+
+def write_array(array_file, array, chunk_size=None):
+    """
+    Writes array to array_file in .npy format, chunk_size rows at a time so that memory-mapped arrays are never read
+    into memory whole
+    """
+    if array.ndim == 0:
+        np.lib.format.write_array(array_file, array, allow_pickle=False)
+        return
+
+    np.lib.format.write_array_header_1_0(array_file, np.lib.format.header_data_from_array_1_0(array))
+    for rows in find_chunks(len(array), chunk_size):
+        array_file.write(np.ascontiguousarray(array[rows]).tobytes())
+
+
+def read_array(array_file, chunk_size=None, directory=None):
+    """
+    Reads an array written by write_array or np.save from array_file, chunk_size rows at a time into an array created
+    with array_storage.create_array in directory
+
+    Returns
+    -------
+    np.ndarray or np.memmap
+    """
+    version = np.lib.format.read_magic(array_file)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(array_file)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(array_file)
+    if fortran_order or dtype.hasobject:
+        raise CheckpointError("Checkpoint arrays must be stored in C order without python objects.")
+    if len(shape) == 0:
+        return np.frombuffer(array_file.read(dtype.itemsize), dtype=dtype).reshape(()).copy()
+
+    array = create_array(shape, dtype, directory)
+    row_size = dtype.itemsize * int(np.prod(shape[1:]))
+    for rows in find_chunks(len(array), chunk_size):
+        num_rows = rows.stop - rows.start
+        array[rows] = np.frombuffer(array_file.read(num_rows * row_size), dtype=dtype).reshape((num_rows,) + shape[1:])
+    return array
+
+
+def write_checkpoint(file_name, run_state, chunk_size=None):
+    """
+    Writes run_state as an uncompressed .npz file, chunk_size rows of each array at a time.  The file is written next to
+    file_name and then renamed over it so that an interrupted write never leaves a damaged checkpoint behind.
+    """
+    temporary_file_name = file_name + ".tmp"
+    with zipfile.ZipFile(temporary_file_name, "w", allowZip64=True) as checkpoint_file:
+        for key, value in run_state.items():
+            with checkpoint_file.open(key + ".npy", "w", force_zip64=True) as array_file:
+                write_array(array_file, np.asanyarray(value), chunk_size)
+    os.replace(temporary_file_name, file_name)
+
+
+def load_checkpoint(file_name, chunk_size=None, directory=None):
+    """
+    Parameters
+    ----------
+    file_name: str containing the checkpoint to load
+    chunk_size: int containing the most rows of an array read into memory at once, or None to read arrays whole
+    directory: str containing the directory to memory-map the loaded arrays from, or None to load them into memory
+
+    Returns
+    -------
+    dictionary of np.ndarrays saved by write_checkpoint
+    """
+    with zipfile.ZipFile(file_name) as checkpoint_file:
+        run_state = {}
+        for name in checkpoint_file.namelist():
+            with checkpoint_file.open(name) as array_file:
+                run_state[name[:-len(".npy")]] = read_array(array_file, chunk_size, directory)
+        return run_state
+
+
+def restore_run_state(particle_swarm, run_state):
+    """
+    Puts a swarm back into the state captured by capture_run_state.  The swarm must have been created from the same
+    arguments as the run that was checkpointed.  The evaluation cache, if any, starts empty.
+
+    Returns
+    -------
+    iteration, iterations_with_same_best_particle_counter, mean_r_squared to continue the run with
+    """
+    if run_state["positions"].shape != particle_swarm.state.positions.shape or \
+            not np.array_equal(run_state["limits"], particle_swarm.limits):
+        raise CheckpointError("Checkpoint was saved from a swarm with different limits or number of particles.")
+    if run_state["positions"].dtype != particle_swarm.state.dtype:
+        raise CheckpointError("Checkpoint was saved from a swarm with dtype " + str(run_state["positions"].dtype) +
+                              ", not " + str(particle_swarm.state.dtype) + ".")
+
+    state = particle_swarm.state
+    for particles in state.find_chunks():
+        state.positions[particles] = run_state["positions"][particles]
+        state.velocities[particles] = run_state["velocities"][particles]
+        state.scores[particles] = run_state["scores"][particles]
+        particle_swarm.r_squareds[particles] = run_state["r_squareds"][particles]
+    particle_swarm.best_particle = particle_swarm[int(run_state["best_particle_id"])]
+    previous_best_particle_id = int(run_state["previous_best_particle_id"])
+    particle_swarm.previous_best_particle = None if previous_best_particle_id < 0 else \
+        particle_swarm[previous_best_particle_id]
+    particle_swarm.fastest_particle = particle_swarm[int(run_state["fastest_particle_id"])]
+    particle_swarm.sigma = run_state["sigma"][()]
+    particle_swarm.local_radius_limit = run_state["local_radius_limit"][()]
+    particle_swarm.velocity_coefficient = run_state["velocity_coefficient"][()]
+    particle_swarm.high_particle_velocity_counter = int(run_state["high_particle_velocity_counter"])
+    particle_swarm.evaluator.evaluation_mode = str(run_state["evaluation_mode"])
+    particle_swarm.state.rng.bit_generator.state = json.loads(str(run_state["rng_state"]))
+
+    return int(run_state["iteration"]), \
+        int(run_state["iterations_with_same_best_particle_counter"]), \
+        run_state["mean_r_squared"][()]
+
+
+class CheckpointWriter:
+    """
+    Writes checkpoints on a background thread so that disk writes do not hold up the optimization loop.  Only one
+    write is in flight at a time; a new checkpoint waits for the previous one to finish so they land in order.  An
+    error in a background write is raised from the next call to write() or wait().
+    """
+
+    def __init__(self, file_name, chunk_size=None):
+        self.file_name = file_name
+        self.chunk_size = chunk_size
+        self.thread = None
+        self.error = None
+
+    def write_in_background(self, run_state):
+        try:
+            write_checkpoint(self.file_name, run_state, self.chunk_size)
+        except Exception as error:
+            self.error = error
+
+    def write(self, run_state):
+        self.wait()
+        self.thread = threading.Thread(target=self.write_in_background, args=(run_state,))
+        self.thread.start()
+
+    def wait(self):
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
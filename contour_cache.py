@@ -0,0 +1,59 @@
+import hashlib
+import inspect
+import os
+import numpy as np
+
+
+def find_cache_key(objective, limits, delta):
+    """
+    Parameters
+    ----------
+    objective: forcing function the grid is computed with
+    limits: (2, 2) size array containing the lower and upper limit of each dimension
+    delta: np.double containing the spacing of the grid
+
+    Returns
+    -------
+    str containing a hash of the source of the module objective is defined in, limits, and delta, so that a change to
+        any of them gives a different key
+    """
+    module = inspect.getmodule(objective)
+    try:
+        source = inspect.getsource(module if module is not None else objective)
+    except (OSError, TypeError):
+        # No source available, such as for a compiled function, so fall back to its name
+        source = getattr(objective, "__module__", "") + "." + getattr(objective, "__qualname__", repr(objective))
+
+    key = hashlib.sha256(source.encode())
+    key.update(np.asarray(limits, dtype=np.double).tobytes())
+    key.update(np.double(delta).tobytes())
+    return key.hexdigest()
+
+
+def load_contour_grid(objective, limits, delta, directory=".contour_cache"):
+    """
+    Evaluates objective on a meshgrid over a 2 dimensional problem, or loads the result of an earlier evaluation from
+    directory.  Grids are stored as .npy files named by find_cache_key and are memory mapped rather than read, so
+    reusing a grid costs almost nothing.  Grids for old versions of the forcing function or other limits are never read
+    again and can be removed by deleting the directory.
+
+    Returns
+    -------
+    x, y: meshgrid arrays of raw positions
+    z: read-only memory mapped array of forcing function scores at x, y
+    """
+    x = np.arange(limits[0][0] + delta, limits[0][1], delta)
+    y = np.arange(limits[1][0] + delta, limits[1][1], delta)
+    x, y = np.meshgrid(x, y)
+    file_name = os.path.join(directory, find_cache_key(objective, limits, delta) + ".npy")
+    if not os.path.exists(file_name):
+        os.makedirs(directory, exist_ok=True)
+        z = np.asarray(objective([x, y]), dtype=np.double)
+
+        # Written under a name unique to this process and then renamed, so runs sharing the cache never read half a grid
+        temporary_file_name = file_name + "." + str(os.getpid()) + ".tmp"
+        with open(temporary_file_name, "wb") as temporary_file:
+            np.save(temporary_file, z)
+        os.replace(temporary_file_name, file_name)
+
+    return x, y, np.load(file_name, mmap_mode="r")
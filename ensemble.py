@@ -0,0 +1,144 @@
+# Author: Julian Pryde
+import argparse
+import contextlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from input_handling import InputHandling
+from optimizer import run
+
+
+def run_member(optimization_arguments, swarm_arguments, member, seed):
+    """
+    Runs one member of an ensemble from start to finish without any output.  Runs in a worker process, which is reused
+    for later members so that the interpreter and imports are only paid for once per worker.
+
+    Parameters
+    ----------
+    optimization_arguments: dictionary of optimization arguments, shared by every member
+    swarm_arguments: dictionary of swarm arguments, shared by every member
+    member: int containing the index of the member within the ensemble
+    seed: int to seed the member's swarm with
+
+    Returns
+    -------
+    dictionary of python data types describing the result of the run
+    """
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = run(optimization_arguments, dict(swarm_arguments, seed=seed))
+
+    return dict(member=member, seed=seed, **result.to_dict())
+
+
+def prepare_worker_arguments(optimization_arguments, swarm_arguments):
+    """
+    Copies the arguments for runs which share the machine with other runs: checkpoints are dropped so runs do not
+    overwrite each other's, and "thread" and "process" evaluation executors become "serial" since the runs already use
+    every core.
+
+    Returns
+    -------
+    optimization_arguments, swarm_arguments
+    """
+    optimization_arguments = {key: value for key, value in optimization_arguments.items()
+                              if key not in ('checkpoint_file', 'checkpoint_interval')}
+    swarm_arguments = dict(swarm_arguments)
+    if swarm_arguments.get('evaluation_executor') in ('thread', 'process'):
+        swarm_arguments['evaluation_executor'] = 'serial'
+
+    return optimization_arguments, swarm_arguments
+
+
+def run_ensemble(optimization_arguments, swarm_arguments, num_runs, num_workers=None, seed=None):
+    """
+    Runs num_runs independent optimizations of the same problem, each seeded differently, spread over a pool of
+    worker processes.
+
+    Members are seeded with seed, seed + 1, ..., so any member can be repeated on its own by running main.py with its
+    seed in the arguments file.  Arguments are adjusted by prepare_worker_arguments.
+
+    Parameters
+    ----------
+    optimization_arguments: dictionary of optimization arguments from InputHandling
+    swarm_arguments: dictionary of swarm arguments from InputHandling
+    num_runs: int containing the number of members in the ensemble
+    num_workers: int containing the number of worker processes, or None for one per CPU core
+    seed: int containing the seed of the first member, or None to pick one at random
+
+    Returns
+    -------
+    list of dictionaries returned by run_member, in member order
+    """
+    if seed is None:
+        seed = int(np.random.SeedSequence().generate_state(1)[0])
+    optimization_arguments, swarm_arguments = prepare_worker_arguments(optimization_arguments, swarm_arguments)
+
+    members = range(num_runs)
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        results = executor.map(run_member,
+                               [optimization_arguments] * num_runs,
+                               [swarm_arguments] * num_runs,
+                               members,
+                               [seed + member for member in members])
+        return list(results)
+
+
+def format_results_table(results, function, label="Member"):
+    """
+    Parameters
+    ----------
+    results: list of dictionaries returned by run_member
+    function: str either "min" or "max", used to rank the members from best to worst
+    label: str heading the column of member numbers
+
+    Returns
+    -------
+    str containing one row per member, best first, followed by a summary of the best scores
+    """
+    ranked_results = sorted(results, key=lambda result: result["best_score"], reverse=function == "max")
+    lines = ["{:>6} {:>12} {:>22} {:>10} {:>9} {:>6} {:>9}  {}".format(
+        label, "Seed", "Best score", "Iterations", "Converged", "Groups", "Time (s)", "Best position"
+    )]
+    for result in ranked_results:
+        lines.append("{:>6} {:>12} {:>22.15g} {:>10} {:>9} {:>6} {:>9.3f}  {}".format(
+            result["member"], result["seed"], result["best_score"], result["iterations"], str(result["converged"]),
+            result["num_groups"], result["wall_time"], str(np.array(result["best_position"]))
+        ))
+
+    best_scores = np.array([result["best_score"] for result in results])
+    lines.append("Best score: " + str(ranked_results[0]["best_score"]) + ", mean: " + str(best_scores.mean()) +
+                 ", standard deviation: " + str(best_scores.std()) + ", converged: " +
+                 str(sum(result["converged"] for result in results)) + "/" + str(len(results)))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run many independent particle swarm optimizations of the problem in "
+                                                 "the arguments file, each with a different seed, in parallel.")
+    parser.add_argument("--runs", type=int, default=os.cpu_count(), help="Number of optimizations to run")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes.  Defaults to the number of CPU cores.")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed of the first run, the rest use the following seeds.  Defaults to the seed in the "
+                             "arguments file, or a random seed if there is none.")
+    parser.add_argument("--output", metavar="JSON_FILE", default=None, help="Also save the results to a JSON file")
+    command_line_arguments = parser.parse_args()
+    arguments = InputHandling()
+    arguments.parse_arguments()
+    first_seed = command_line_arguments.seed
+    if first_seed is None:
+        first_seed = arguments.swarm_initiation_arguments.get('seed')
+
+    ensemble_start_time = time.perf_counter()
+    ensemble_results = run_ensemble(arguments.optimization_arguments,
+                                    arguments.swarm_initiation_arguments,
+                                    command_line_arguments.runs,
+                                    command_line_arguments.workers,
+                                    first_seed)
+    print(format_results_table(ensemble_results, arguments.optimization_arguments['function']))
+    print("Total time: " + str(time.perf_counter() - ensemble_start_time) + " seconds")
+    if command_line_arguments.output is not None:
+        with open(command_line_arguments.output, "w") as output_file:
+            json.dump(ensemble_results, output_file, indent=4)
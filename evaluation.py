@@ -0,0 +1,330 @@
+import os
+import asyncio
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+
+
+# Keys in the swarm arguments which configure how the forcing function is evaluated
+evaluation_argument_keys = ("evaluation_mode", "evaluation_executor", "evaluation_workers", "evaluation_concurrency",
+                            "evaluation_timeout", "evaluation_retries", "evaluation_cache_size",
+                            "evaluation_cache_tolerance")
+
+
+class EvaluationError(Exception):
+    pass
+
+
+def evaluate_batched(objective, raw_positions):
+    """
+    Parameters
+    ----------
+    objective: forcing function
+    raw_positions: (num_particles, num_dimensions) size np.ndarray of np.doubles
+
+    Returns
+    -------
+    (num_particles) size np.ndarray of np.doubles containing the score of each particle
+    """
+    scores = np.asarray(objective(raw_positions.T), dtype=np.double)
+    if scores.shape != (len(raw_positions),):
+        raise ValueError("Forcing function returned scores of shape " + str(scores.shape) + " for " +
+                         str(len(raw_positions)) + " particles.")
+
+    return scores
+
+
+def evaluate_per_particle(objective, raw_positions):
+    """
+    Parameters
+    ----------
+    objective: forcing function
+    raw_positions: (num_particles, num_dimensions) size np.ndarray of np.doubles
+
+    Returns
+    -------
+    (num_particles) size np.ndarray of np.doubles containing the score of each particle
+    """
+    return np.array([objective(raw_position) for raw_position in raw_positions], dtype=np.double)
+
+
+class EvaluationCache:
+    """
+    Least recently used cache of forcing function scores, keyed on raw positions rounded to the nearest multiple of
+    tolerance.  Particles which have converged onto the same point stop costing a forcing function call each.
+    """
+
+    def __init__(self, max_size, tolerance):
+        """
+        self.max_size: int containing the most scores kept before the least recently used is evicted
+
+        self.tolerance: np.double containing the spacing, in raw units, of the grid positions are rounded to
+
+        self.scores: OrderedDict of scores keyed on rounded position, ordered from least to most recently used
+
+        self.hits: int containing the number of particles whose score was reused
+
+        self.misses: int containing the number of positions which had to be evaluated
+        """
+        self.max_size = max_size
+        self.tolerance = tolerance
+        self.scores = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.scores)
+
+    def find_keys(self, raw_positions):
+        """
+        Returns
+        -------
+        (num_particles, num_dimensions) size np.ndarray of np.int64 containing each position rounded to the cache grid
+        """
+        return np.round(raw_positions / self.tolerance).astype(np.int64)
+
+    def lookup(self, keys):
+        """
+        Parameters
+        ----------
+        keys: array returned by self.find_keys()
+
+        Returns
+        -------
+        scores: (num_particles) size np.ndarray of np.doubles containing cached scores, np.nan where not cached
+        missing: (num_particles) size np.ndarray of np.bools, True where not cached
+        """
+        scores = np.full(len(keys), np.nan)
+        missing = np.ones(len(keys), dtype=np.bool_)
+        for index, key in enumerate(keys):
+            key = key.tobytes()
+            if key in self.scores:
+                self.scores.move_to_end(key)
+                scores[index] = self.scores[key]
+                missing[index] = False
+
+        return scores, missing
+
+    def store(self, keys, scores):
+        for key, score in zip(keys, scores):
+            self.scores[key.tobytes()] = score
+        while len(self.scores) > self.max_size:
+            self.scores.popitem(last=False)
+
+    def report(self):
+        return "Evaluation cache hits: " + str(self.hits) + ", misses: " + str(self.misses) + ", size: " + \
+            str(len(self)) + "/" + str(self.max_size)
+
+
+class ForcingFunctionEvaluator:
+    """
+    Scores every particle in a swarm with the forcing function.
+
+    In "batched" mode the forcing function is called once per iteration with the raw positions of the whole swarm laid
+    out one dimension per row, the same way PlotParticles.create_contour_overlay passes its meshgrid arrays, and must
+    return one score per particle.  In "per_particle" mode it is called once for each particle with a single raw
+    position.  A batched call that fails or returns the wrong number of scores drops the evaluator back to
+    "per_particle" mode for the rest of the run, so scalar-only forcing functions still work.
+
+    With a "thread" or "process" executor the swarm is split into contiguous chunks which are scored on a pool of
+    workers, and the scores are put back together in particle order, so the results are identical to a "serial" run.
+    Threads suit forcing functions that release the GIL, such as numpy or C code, and processes suit pure python ones.
+    A process executor requires a forcing function defined at module level so that it can be pickled.
+
+    With an "async" executor the forcing function must be an async callable taking a single raw position, such as a
+    simulation_server.SimulationClient.  Every particle is sent at once on an event loop kept for the life of the
+    evaluator, with at most evaluation_concurrency calls in flight.  Each call is cancelled after evaluation_timeout
+    seconds and a call that times out or fails to connect is retried up to evaluation_retries times.
+
+    A positive evaluation_cache_size puts an EvaluationCache in front of every executor, so only positions not seen
+    within evaluation_cache_tolerance are evaluated, and particles sharing a position are evaluated once.
+    """
+
+    # Number of chunks handed to each worker per evaluation, so that uneven forcing function costs balance out
+    chunks_per_worker = 4
+
+    # Seconds to wait before the first retry of a failed async call, doubled for each following retry
+    retry_delay = 0.05
+
+    def __init__(self, objective, evaluation_mode="batched", evaluation_executor="serial", evaluation_workers=None,
+                 evaluation_concurrency=64, evaluation_timeout=30.0, evaluation_retries=2, evaluation_cache_size=0,
+                 evaluation_cache_tolerance=1e-9):
+        """
+        self.objective: forcing function to be evaluated
+
+        self.evaluation_mode: str either "batched" or "per_particle"
+
+        self.evaluation_mode_checked: bool, True once the forcing function has been evaluated in evaluation_mode.  Only
+            the first batched evaluation falls back to per_particle if the forcing function cannot score every position
+            at once, so that errors in later iterations are raised instead of hidden
+
+        self.evaluation_executor: str either "serial", "thread", "process", or "async"
+
+        self.evaluation_workers: int containing the number of workers used by a "thread" or "process" executor
+
+        self.evaluation_concurrency: int containing the most async calls allowed in flight at once
+
+        self.evaluation_timeout: seconds before an async call is cancelled, or None to wait indefinitely
+
+        self.evaluation_retries: int containing the number of times a failed async call is retried
+
+        self.executor: concurrent.futures executor, created on first use
+
+        self.event_loop: asyncio event loop used by the "async" executor, created on first use
+
+        self.cache: EvaluationCache, or None when evaluation_cache_size is 0
+
+        self.num_evaluations: int containing the number of positions scored with the forcing function, not counting
+            scores taken from the cache
+        """
+        self.objective = objective
+        self.evaluation_mode = evaluation_mode
+        self.evaluation_mode_checked = False
+        self.evaluation_executor = evaluation_executor
+        self.evaluation_workers = evaluation_workers if evaluation_workers is not None else os.cpu_count()
+        self.evaluation_concurrency = evaluation_concurrency
+        self.evaluation_timeout = evaluation_timeout
+        self.evaluation_retries = evaluation_retries
+        self.executor = None
+        self.event_loop = None
+        self.cache = EvaluationCache(evaluation_cache_size, evaluation_cache_tolerance) \
+            if evaluation_cache_size > 0 else None
+        self.num_evaluations = 0
+
+    def get_executor(self):
+        if self.executor is None:
+            if self.evaluation_executor == "thread":
+                self.executor = ThreadPoolExecutor(max_workers=self.evaluation_workers)
+            elif self.evaluation_executor == "process":
+                self.executor = ProcessPoolExecutor(max_workers=self.evaluation_workers)
+
+        return self.executor
+
+    def shutdown(self):
+        """
+        Stops any worker threads or processes.  The evaluator can still be used afterwards and will start new ones.
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.event_loop is not None:
+            self.event_loop.close()
+            self.event_loop = None
+
+    async def evaluate_particle_async(self, semaphore, raw_position):
+        """
+        Awaits the forcing function for a single particle, retrying calls which time out or cannot connect.
+
+        Returns
+        -------
+        np.double containing the score of the particle
+        """
+        async with semaphore:
+            for attempt in range(self.evaluation_retries + 1):
+                try:
+                    return np.double(await asyncio.wait_for(self.objective(raw_position), self.evaluation_timeout))
+                except (asyncio.TimeoutError, OSError) as error:
+                    if attempt == self.evaluation_retries:
+                        raise EvaluationError("Forcing function failed at position " + str(raw_position) + " after " +
+                                              str(attempt + 1) + " attempts.") from error
+                    await asyncio.sleep(self.retry_delay * 2 ** attempt)
+
+    async def evaluate_swarm_async(self, raw_positions):
+        semaphore = asyncio.Semaphore(self.evaluation_concurrency)
+        scores = await asyncio.gather(
+            *(self.evaluate_particle_async(semaphore, raw_position) for raw_position in raw_positions)
+        )
+        return np.array(scores, dtype=np.double)
+
+    def evaluate_async(self, raw_positions):
+        """
+        Scores all particles concurrently with the async forcing function.
+
+        Returns
+        -------
+        (num_particles) size np.ndarray of np.doubles containing the score of each particle
+        """
+        if self.event_loop is None:
+            self.event_loop = asyncio.new_event_loop()
+
+        return self.event_loop.run_until_complete(self.evaluate_swarm_async(raw_positions))
+
+    def map_chunks(self, evaluation_function, raw_positions):
+        """
+        Applies evaluation_function to the whole swarm, either directly or split over the executor's workers.
+
+        Returns
+        -------
+        (num_particles) size np.ndarray of np.doubles containing the score of each particle
+        """
+        if self.evaluation_executor == "serial" or len(raw_positions) < 2:
+            return evaluation_function(self.objective, raw_positions)
+
+        num_chunks = min(len(raw_positions), self.evaluation_workers * self.chunks_per_worker)
+        chunks = np.array_split(raw_positions, num_chunks)
+        chunk_scores = self.get_executor().map(evaluation_function, [self.objective] * num_chunks, chunks)
+        return np.concatenate(list(chunk_scores))
+
+    def evaluate(self, raw_positions):
+        """
+        Scores all particles, only evaluating positions that are not in the cache if there is one.
+
+        Parameters
+        ----------
+        raw_positions: (num_particles, num_dimensions) size np.ndarray of np.doubles
+
+        Returns
+        -------
+        (num_particles) size np.ndarray of np.doubles containing the score of each particle
+        """
+        if self.cache is None:
+            return self.evaluate_uncached(raw_positions)
+
+        keys = self.cache.find_keys(raw_positions)
+        scores, missing = self.cache.lookup(keys)
+        num_evaluated = 0
+        if np.any(missing):
+            new_keys, first_particles, particle_keys = np.unique(
+                keys[missing], axis=0, return_index=True, return_inverse=True
+            )
+            new_scores = self.evaluate_uncached(raw_positions[missing][first_particles])
+            scores[missing] = new_scores[particle_keys.ravel()]
+            self.cache.store(new_keys, new_scores)
+            num_evaluated = len(new_keys)
+
+        self.cache.misses += num_evaluated
+        self.cache.hits += len(raw_positions) - num_evaluated
+        return scores
+
+    def evaluate_uncached(self, raw_positions):
+        """
+        Scores all particles using the current executor and evaluation mode.
+
+        Parameters
+        ----------
+        raw_positions: (num_particles, num_dimensions) size np.ndarray of np.doubles
+
+        Returns
+        -------
+        (num_particles) size np.ndarray of np.doubles containing the score of each particle
+        """
+        self.num_evaluations += len(raw_positions)
+        if self.evaluation_executor == "async":
+            return self.evaluate_async(raw_positions)
+
+        if self.evaluation_mode == "batched" and self.evaluation_mode_checked:
+            return self.map_chunks(evaluate_batched, raw_positions)
+
+        if self.evaluation_mode == "batched":
+            try:
+                scores = self.map_chunks(evaluate_batched, raw_positions)
+            except (TypeError, ValueError, IndexError) as error:
+                scores = self.map_chunks(evaluate_per_particle, raw_positions)
+                warnings.warn("Forcing function cannot be evaluated for the whole swarm at once (" + str(error) + "). "
+                              "Falling back to evaluating one particle at a time.", RuntimeWarning)
+                self.evaluation_mode = "per_particle"
+            self.evaluation_mode_checked = True
+            return scores
+
+        return self.map_chunks(evaluate_per_particle, raw_positions)
@@ -1,4 +1,14 @@
 def forcing_function(particle_positions):
+    """
+    Parameters
+    ----------
+    particle_positions: indexable by dimension.  Each element is either the scalar raw position of a single particle,
+        an (num_particles) size array when the whole swarm is scored at once, or a meshgrid array when plotting
+
+    Returns
+    -------
+    score with the same shape as each element of particle_positions
+    """
     x = particle_positions[0]
     y = particle_positions[1]
     # z = particle_positions[2]
@@ -2,6 +2,36 @@ import numpy as np
 import json
 
 
+# Arguments which may be left out of the arguments file, in which case the swarm uses its own default
+optional_arguments = [
+    "evaluation_mode",
+    "evaluation_executor",
+    "evaluation_workers",
+    "evaluation_concurrency",
+    "evaluation_timeout",
+    "evaluation_retries",
+    "simulation_server",
+    "evaluation_cache_size",
+    "evaluation_cache_tolerance",
+    "neighbor_skin",
+    "seed",
+    "checkpoint_file",
+    "checkpoint_interval",
+    "telemetry_file",
+    "telemetry_format",
+    "telemetry_interval",
+    "telemetry_buffer_size",
+    "telemetry_scores",
+    "trajectory_file",
+    "trajectory_interval",
+    "trajectory_max_particles",
+    "phase_timers",
+    "dtype",
+    "storage_directory",
+    "chunk_size",
+]
+
+
 def read_arguments_file():
     """
     Reads contents of arguments JSON file into a python dictionary
@@ -22,8 +52,11 @@ class ArgumentException(Exception):
 
 class InputHandling:
 
-    def __init__(self):
+    def __init__(self, arguments=None):
         """
+        arguments: dictionary of un-formatted arguments in the format of the arguments file, or None to read the
+            arguments file in the current directory
+
         self.arguments: dictionary of un-formatted arguments
         self.formatted_arguments: dictionary of arguments with values formatted into data types as follows:
             num_particles: np.int_
@@ -38,9 +71,34 @@ class InputHandling:
             run_limit: np.int_
             velocity_update_method: string
             least_squares_method: string
+            evaluation_mode (optional): string
+            evaluation_executor (optional): string
+            evaluation_workers (optional): np.int_
+            evaluation_concurrency (optional): np.int_
+            evaluation_timeout (optional): np.double
+            evaluation_retries (optional): np.int_
+            simulation_server (optional): string
+            evaluation_cache_size (optional): np.int_
+            evaluation_cache_tolerance (optional): np.double
+            neighbor_skin (optional): np.double
+            seed (optional): int
+            checkpoint_file (optional): string
+            checkpoint_interval (optional): np.int_
+            telemetry_file (optional): string
+            telemetry_format (optional): string
+            telemetry_interval (optional): np.int_
+            telemetry_buffer_size (optional): np.int_
+            telemetry_scores (optional): bool
+            trajectory_file (optional): string
+            trajectory_interval (optional): np.int_
+            trajectory_max_particles (optional): np.int_
+            phase_timers (optional): bool
+            dtype (optional): string
+            storage_directory (optional): string
+            chunk_size (optional): np.int_
         self.total_num_arguments_expected: Total number of arguments expected to determine if an argument is missing
         """
-        self.arguments = read_arguments_file()
+        self.arguments = dict(arguments) if arguments is not None else read_arguments_file()
         self.optimization_arguments = {}
         self.swarm_initiation_arguments = {}
         self.total_num_arguments_expected = 13
@@ -72,8 +130,7 @@ class InputHandling:
         Looks for all argument in self.arguments and assigns them to self.formatted_arguments with their data type.
             Ensures that the correct number of arguments have been ingested.
         """
-        index = 0
-        for index, key in enumerate(self.arguments):
+        for key in self.arguments:
             if "num_particles" in key:
                 self.assign_swarm_initiation_arguments(key, np.int_)
                 if self.swarm_initiation_arguments[key] < 0:
@@ -116,10 +173,106 @@ class InputHandling:
                 self.assign_swarm_initiation_arguments(key, np.double)
                 if self.swarm_initiation_arguments[key] < 0:
                     raise ArgumentException("Minimum Local Radius Limit cannot be less than 0.")
+            elif "evaluation_mode" in key:
+                self.assign_swarm_initiation_arguments(key, str)
+                if self.swarm_initiation_arguments[key] != "batched" and \
+                        self.swarm_initiation_arguments[key] != "per_particle":
+                    raise ArgumentException("Evaluation Mode must be either 'batched' or 'per_particle'.")
+            elif "evaluation_executor" in key:
+                self.assign_swarm_initiation_arguments(key, str)
+                if self.swarm_initiation_arguments[key] not in ("serial", "thread", "process", "async"):
+                    raise ArgumentException("Evaluation Executor must be either 'serial', 'thread', 'process', or "
+                                            "'async'.")
+            elif "evaluation_workers" in key:
+                self.assign_swarm_initiation_arguments(key, np.int_)
+                if self.swarm_initiation_arguments[key] <= 0:
+                    raise ArgumentException("Number of Evaluation Workers must be larger than 0.")
+            elif "evaluation_concurrency" in key:
+                self.assign_swarm_initiation_arguments(key, np.int_)
+                if self.swarm_initiation_arguments[key] <= 0:
+                    raise ArgumentException("Evaluation Concurrency must be larger than 0.")
+            elif "evaluation_timeout" in key:
+                self.assign_swarm_initiation_arguments(key, np.double)
+                if self.swarm_initiation_arguments[key] <= 0:
+                    raise ArgumentException("Evaluation Timeout must be larger than 0.")
+            elif "evaluation_retries" in key:
+                self.assign_swarm_initiation_arguments(key, np.int_)
+                if self.swarm_initiation_arguments[key] < 0:
+                    raise ArgumentException("Evaluation Retries cannot be less than 0.")
+            elif "evaluation_cache_size" in key:
+                self.assign_swarm_initiation_arguments(key, np.int_)
+                if self.swarm_initiation_arguments[key] < 0:
+                    raise ArgumentException("Evaluation Cache Size cannot be less than 0.")
+            elif "evaluation_cache_tolerance" in key:
+                self.assign_swarm_initiation_arguments(key, np.double)
+                if self.swarm_initiation_arguments[key] <= 0:
+                    raise ArgumentException("Evaluation Cache Tolerance must be larger than 0.")
+            elif "neighbor_skin" in key:
+                self.assign_swarm_initiation_arguments(key, np.double)
+                if self.swarm_initiation_arguments[key] < 0:
+                    raise ArgumentException("Neighbor Skin cannot be less than 0.")
+            elif "seed" in key:
+                self.assign_swarm_initiation_arguments(key, int)
+                if self.swarm_initiation_arguments[key] < 0:
+                    raise ArgumentException("Seed cannot be less than 0.")
+            elif "checkpoint_file" in key:
+                self.assign_optimization_argument(key, str)
+            elif "checkpoint_interval" in key:
+                self.assign_optimization_argument(key, np.int_)
+                if self.optimization_arguments[key] <= 0:
+                    raise ArgumentException("Checkpoint Interval must be larger than 0.")
+            elif "telemetry_file" in key:
+                self.assign_optimization_argument(key, str)
+            elif "telemetry_format" in key:
+                self.assign_optimization_argument(key, str)
+                if self.optimization_arguments[key] != "jsonl" and self.optimization_arguments[key] != "binary":
+                    raise ArgumentException("Telemetry Format must be either 'jsonl' or 'binary'.")
+            elif "telemetry_interval" in key:
+                self.assign_optimization_argument(key, np.int_)
+                if self.optimization_arguments[key] <= 0:
+                    raise ArgumentException("Telemetry Interval must be larger than 0.")
+            elif "telemetry_buffer_size" in key:
+                self.assign_optimization_argument(key, np.int_)
+                if self.optimization_arguments[key] <= 0:
+                    raise ArgumentException("Telemetry Buffer Size must be larger than 0.")
+            elif "telemetry_scores" in key:
+                self.assign_optimization_argument(key, bool)
+            elif "trajectory_file" in key:
+                self.assign_optimization_argument(key, str)
+            elif "trajectory_interval" in key:
+                self.assign_optimization_argument(key, np.int_)
+                if self.optimization_arguments[key] <= 0:
+                    raise ArgumentException("Trajectory Interval must be larger than 0.")
+            elif "trajectory_max_particles" in key:
+                self.assign_optimization_argument(key, np.int_)
+                if self.optimization_arguments[key] <= 0:
+                    raise ArgumentException("Trajectory Max Particles must be larger than 0.")
+            elif "phase_timers" in key:
+                self.assign_optimization_argument(key, bool)
+            elif "dtype" in key:
+                self.assign_swarm_initiation_arguments(key, str)
+                if self.swarm_initiation_arguments[key] != "float64" and \
+                        self.swarm_initiation_arguments[key] != "float32":
+                    raise ArgumentException("Dtype must be either 'float64' or 'float32'.")
+            elif "storage_directory" in key:
+                self.assign_swarm_initiation_arguments(key, str)
+            elif "chunk_size" in key:
+                self.assign_swarm_initiation_arguments(key, np.int_)
+                if self.swarm_initiation_arguments[key] <= 0:
+                    raise ArgumentException("Chunk Size must be larger than 0.")
+            elif "simulation_server" in key:
+                self.assign_swarm_initiation_arguments(key, str)
+                if ":" not in self.swarm_initiation_arguments[key]:
+                    raise ArgumentException("Simulation Server must be given as 'host:port'.")
             else:
                 raise ArgumentException("Argument: " + key + " is not necessary")
 
-        if index < self.total_num_arguments_expected - 1:
+        if "simulation_server" in self.swarm_initiation_arguments and \
+                self.swarm_initiation_arguments.get("evaluation_executor") != "async":
+            raise ArgumentException("A Simulation Server can only be used with the 'async' Evaluation Executor.")
+
+        num_required_arguments = len([key for key in self.arguments if key not in optional_arguments])
+        if num_required_arguments < self.total_num_arguments_expected:
             raise ArgumentException("One or more arguments missing")
 
     def print_arguments(self):
@@ -0,0 +1,267 @@
+# Author: Julian Pryde
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from input_handling import InputHandling
+from optimizer import run
+from ensemble import prepare_worker_arguments, format_results_table
+
+
+# Set in each island's process by attach_migration_board
+migration_board = None
+
+
+def find_migration_sources(island, num_islands, topology):
+    """
+    Parameters
+    ----------
+    island: int containing the index of the receiving island
+    num_islands: int containing the total number of islands
+    topology: str either "ring", where each island receives from the island before it, or "fully_connected", where
+        each island receives from every other island
+
+    Returns
+    -------
+    list of ints containing the indices of the islands that island receives migrants from
+    """
+    if num_islands < 2:
+        return []
+    if topology == "ring":
+        return [(island - 1) % num_islands]
+    elif topology == "fully_connected":
+        return [source for source in range(num_islands) if source != island]
+    else:
+        raise ValueError("Unknown migration topology: " + str(topology))
+
+
+class MigrationBoard:
+    """
+    Shared memory holding the last particle each island sent out, one slot per island.  Islands post to their own slot
+    and read the slots of the islands they receive from whenever they reach a migration iteration, without waiting for
+    each other, so an island that stops early never holds up the rest.
+    """
+
+    def __init__(self, num_islands, num_dimensions):
+        """
+        self.num_islands, self.num_dimensions: size of the board
+
+        self.shared_positions, self.shared_velocities: shared (num_islands * num_dimensions) size buffers of doubles
+            holding the normalized position and velocity of each island's last migrant
+
+        self.shared_versions: shared (num_islands) size buffer of int64s counting the migrants each island has posted
+
+        self.lock: multiprocessing.Lock held while a slot is written or the board is read
+        """
+        self.num_islands = num_islands
+        self.num_dimensions = num_dimensions
+        self.shared_positions = multiprocessing.RawArray('d', num_islands * num_dimensions)
+        self.shared_velocities = multiprocessing.RawArray('d', num_islands * num_dimensions)
+        self.shared_versions = multiprocessing.RawArray('q', num_islands)
+        self.lock = multiprocessing.Lock()
+
+    @property
+    def positions(self):
+        return np.frombuffer(self.shared_positions, dtype=np.double).reshape(self.num_islands, self.num_dimensions)
+
+    @property
+    def velocities(self):
+        return np.frombuffer(self.shared_velocities, dtype=np.double).reshape(self.num_islands, self.num_dimensions)
+
+    @property
+    def versions(self):
+        return np.frombuffer(self.shared_versions, dtype=np.int64)
+
+    def post(self, island, position, velocity):
+        with self.lock:
+            self.positions[island] = position
+            self.velocities[island] = velocity
+            self.versions[island] += 1
+
+    def collect(self, sources, versions_seen):
+        """
+        Parameters
+        ----------
+        sources: list of ints containing the islands to read from
+        versions_seen: (num_islands) size array of np.int64 containing the version of each slot already taken, updated
+            in place
+
+        Returns
+        -------
+        positions, velocities: (num_migrants, num_dimensions) size arrays of the migrants not yet taken from sources
+        """
+        with self.lock:
+            versions = self.versions.copy()
+            new_sources = [source for source in sources if versions[source] > versions_seen[source]]
+            positions = self.positions[new_sources]
+            velocities = self.velocities[new_sources]
+        versions_seen[new_sources] = versions[new_sources]
+        return positions, velocities
+
+
+def attach_migration_board(board):
+    global migration_board
+    migration_board = board
+
+
+class Island:
+    """
+    One sub-swarm of an island model run.  Every migration_interval iterations it posts a copy of its best particle to
+    the migration board and replaces its worst particles with the migrants posted by its source islands.
+    """
+
+    def __init__(self, index, board, sources, migration_interval, function):
+        """
+        self.index: int containing the index of this island
+
+        self.board: MigrationBoard shared by all islands
+
+        self.sources: list of ints containing the islands migrants are received from
+
+        self.migration_interval: int containing the number of iterations between migrations
+
+        self.function: str either "min" or "max"
+
+        self.versions_seen: (num_islands) size array of np.int64 containing the last migrant taken from each island
+
+        self.num_sent, self.num_received: int counters of migrants sent and received
+        """
+        self.index = index
+        self.board = board
+        self.sources = sources
+        self.migration_interval = migration_interval
+        self.function = function
+        self.versions_seen = np.zeros(board.num_islands, dtype=np.int64)
+        self.num_sent = 0
+        self.num_received = 0
+
+    def find_worst_particles(self, particle_swarm, num_particles):
+        """
+        Returns
+        -------
+        (num_particles) size array of the ids of the worst scoring particles, never including the best particle
+        """
+        scores = particle_swarm.state.scores if self.function == "max" else -particle_swarm.state.scores
+        candidates = np.flatnonzero(np.arange(len(scores)) != particle_swarm.best_particle.id)
+        return candidates[np.argsort(scores[candidates], kind="stable")[:num_particles]]
+
+    def migrate(self, particle_swarm, iteration):
+        """
+        Called by main.optimize at the end of every iteration.  The migrants are scored along with the rest of the
+        swarm at the start of the next iteration.
+        """
+        if iteration % self.migration_interval != 0:
+            return
+
+        best_particle = particle_swarm.best_particle
+        self.board.post(self.index, best_particle.position, best_particle.velocity)
+        self.num_sent += 1
+
+        positions, velocities = self.board.collect(self.sources, self.versions_seen)
+        if len(positions) == 0:
+            return
+        worst_particles = self.find_worst_particles(particle_swarm, len(positions))
+        particle_swarm.state.positions[worst_particles] = positions[:len(worst_particles)]
+        particle_swarm.state.velocities[worst_particles] = velocities[:len(worst_particles)]
+        self.num_received += len(worst_particles)
+
+
+def run_island(optimization_arguments, swarm_arguments, index, num_particles, seed, sources, migration_interval):
+    """
+    Runs one island from start to finish without any output.  Runs in its own worker process, which has been given the
+    migration board by attach_migration_board.
+
+    Returns
+    -------
+    dictionary of python data types describing the result of the island's run
+    """
+    island = Island(index, migration_board, sources, migration_interval, optimization_arguments['function'])
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = run(optimization_arguments, dict(swarm_arguments, num_particles=num_particles, seed=seed),
+                     iteration_callback=island.migrate)
+
+    return dict(member=index, seed=seed, **result.to_dict(), migrants_sent=island.num_sent,
+                migrants_received=island.num_received)
+
+
+def run_islands(optimization_arguments, swarm_arguments, num_islands, migration_interval=20, topology="ring",
+                seed=None):
+    """
+    Splits the swarm's particles between num_islands sub-swarms which are optimized at the same time in their own
+    processes, exchanging their best particles every migration_interval iterations.  Islands are seeded with seed,
+    seed + 1, ... and arguments are adjusted by ensemble.prepare_worker_arguments.
+
+    Parameters
+    ----------
+    optimization_arguments: dictionary of optimization arguments from InputHandling
+    swarm_arguments: dictionary of swarm arguments from InputHandling.  num_particles is the total over all islands
+    num_islands: int containing the number of islands
+    migration_interval: int containing the number of iterations between migrations
+    topology: str either "ring" or "fully_connected", see find_migration_sources
+    seed: int containing the seed of the first island, or None to pick one at random
+
+    Returns
+    -------
+    list of dictionaries returned by run_island, in island order
+    """
+    island_sizes = [len(island) for island in np.array_split(np.arange(swarm_arguments['num_particles']), num_islands)]
+    migration_sources = [find_migration_sources(island, num_islands, topology) for island in range(num_islands)]
+    if min(island_sizes) <= len(migration_sources[0]) + 3:
+        raise ValueError("Too few particles for " + str(num_islands) + " islands. Each island needs more than " +
+                         str(len(migration_sources[0]) + 3) + " particles.")
+    if seed is None:
+        seed = int(np.random.SeedSequence().generate_state(1)[0])
+    optimization_arguments, swarm_arguments = prepare_worker_arguments(optimization_arguments, swarm_arguments)
+
+    board = MigrationBoard(num_islands, len(swarm_arguments['limits']))
+    islands = range(num_islands)
+    # Every island must be running at once, so there is one worker process per island
+    with ProcessPoolExecutor(max_workers=num_islands, initializer=attach_migration_board,
+                             initargs=(board,)) as executor:
+        results = executor.map(run_island,
+                               [optimization_arguments] * num_islands,
+                               [swarm_arguments] * num_islands,
+                               islands,
+                               island_sizes,
+                               [seed + island for island in islands],
+                               migration_sources,
+                               [migration_interval] * num_islands)
+        return list(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Optimize the problem in the arguments file with an island model: the "
+                                                 "particles are split between sub-swarms running in parallel which "
+                                                 "periodically exchange their best particles.")
+    parser.add_argument("--islands", type=int, default=os.cpu_count(), help="Number of islands")
+    parser.add_argument("--migration-interval", type=int, default=20, help="Iterations between migrations")
+    parser.add_argument("--topology", choices=["ring", "fully_connected"], default="ring",
+                        help="Which islands receive each island's best particle")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed of the first island, the rest use the following seeds.  Defaults to the seed in "
+                             "the arguments file, or a random seed if there is none.")
+    parser.add_argument("--output", metavar="JSON_FILE", default=None, help="Also save the results to a JSON file")
+    command_line_arguments = parser.parse_args()
+    arguments = InputHandling()
+    arguments.parse_arguments()
+    first_seed = command_line_arguments.seed
+    if first_seed is None:
+        first_seed = arguments.swarm_initiation_arguments.get('seed')
+
+    islands_start_time = time.perf_counter()
+    island_results = run_islands(arguments.optimization_arguments,
+                                 arguments.swarm_initiation_arguments,
+                                 command_line_arguments.islands,
+                                 command_line_arguments.migration_interval,
+                                 command_line_arguments.topology,
+                                 first_seed)
+    print(format_results_table(island_results, arguments.optimization_arguments['function'], label="Island"))
+    print("Migrants received: " + str(sum(result["migrants_received"] for result in island_results)))
+    print("Total time: " + str(time.perf_counter() - islands_start_time) + " seconds")
+    if command_line_arguments.output is not None:
+        with open(command_line_arguments.output, "w") as output_file:
+            json.dump(island_results, output_file, indent=4)
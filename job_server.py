@@ -0,0 +1,322 @@
+# Author: Julian Pryde
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from input_handling import InputHandling, ArgumentException
+from optimizer import run
+from ensemble import prepare_worker_arguments
+from math_functions import find_hypotenuse
+
+
+# Set in each worker process by attach_progress_queue
+progress_queue = None
+
+
+def attach_progress_queue(queue):
+    global progress_queue
+    progress_queue = queue
+
+
+def warm_up():
+    """
+    Does nothing.  Submitted once per worker when the server starts so that every worker process is started, with
+    numpy and the optimizer modules imported, before the first job arrives.
+    """
+
+
+def run_job(job_id, optimization_arguments, swarm_arguments, progress_interval):
+    """
+    Runs one job in a worker process.  A "started" event, a "progress" event every progress_interval iterations, and
+    finally a "result" event are sent through the progress queue, so they reach the server in order.
+    """
+    def report_progress(particle_swarm, iteration):
+        if iteration % progress_interval == 0:
+            progress_queue.put({"job_id": job_id,
+                                "event": "progress",
+                                "iteration": int(iteration),
+                                "best_score": float(particle_swarm.best_particle.score),
+                                "most_movement": float(find_hypotenuse(particle_swarm.fastest_particle.velocity))})
+
+    progress_queue.put({"job_id": job_id, "event": "started", "worker": os.getpid()})
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = run(optimization_arguments, swarm_arguments, iteration_callback=report_progress)
+    progress_queue.put({"job_id": job_id, "event": "result", "result": result.to_dict()})
+
+
+class Job:
+    """
+    State of one submitted job as seen by the server.  Events from the worker are appended as they arrive, and any
+    number of clients can follow them with iterate_events().
+    """
+
+    def __init__(self, job_id):
+        """
+        self.id: int identifying the job
+
+        self.status: str either "queued", "running", "done", or "failed"
+
+        self.events: list of event dictionaries received so far
+
+        self.result: dictionary from optimizer.OptimizationResult.to_dict() once done, otherwise None
+
+        self.error: str describing why the job failed, otherwise None
+
+        self.condition: threading.Condition notified whenever an event is added
+        """
+        self.id = job_id
+        self.status = "queued"
+        self.events = []
+        self.result = None
+        self.error = None
+        self.condition = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    def add_event(self, event):
+        with self.condition:
+            if self.finished:
+                return
+            self.events.append(event)
+            if event["event"] == "started":
+                self.status = "running"
+            elif event["event"] == "result":
+                self.status = "done"
+                self.result = event["result"]
+            elif event["event"] == "error":
+                self.status = "failed"
+                self.error = event["error"]
+            self.condition.notify_all()
+
+    def iterate_events(self):
+        """
+        Yields every event of the job, waiting for new ones until the job has finished.
+        """
+        num_sent = 0
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: len(self.events) > num_sent or self.finished)
+                new_events = self.events[num_sent:]
+                finished = self.finished
+            yield from new_events
+            num_sent += len(new_events)
+            if finished and num_sent == len(self.events):
+                return
+
+    def summarize(self):
+        return {"job_id": self.id, "status": self.status, "result": self.result, "error": self.error}
+
+
+class JobServer:
+    """
+    Local HTTP server which runs optimization jobs on a pool of worker processes started ahead of time, so a job only
+    costs the optimization itself.  Jobs are arguments files, as JSON, posted to /jobs, and are queued until a worker
+    is free.
+
+        POST /jobs?progress_interval=N   submit a job, replies with its job_id
+        GET  /jobs                       status of every job kept
+        GET  /jobs/<job_id>              status, and result once done, of one job
+        GET  /jobs/<job_id>/events       stream of the job's events as JSON lines, ending with its result or error
+
+    Jobs score particles with the forcing function, or the simulation_server in their arguments.  The most recent
+    max_finished_jobs finished jobs are kept for clients to read.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8766, num_workers=None, max_finished_jobs=1000):
+        """
+        self.host, self.port: address to listen on.  Port 0 picks a free port, which is stored in self.port on start
+
+        self.num_workers: int containing the number of worker processes, or None for one per CPU core, which is stored
+            in self.num_workers on start
+
+        self.jobs: OrderedDict of Jobs by job id, oldest first
+        """
+        self.host = host
+        self.port = port
+        self.num_workers = num_workers
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs = OrderedDict()
+        self.jobs_lock = threading.Lock()
+        self.job_ids = itertools.count()
+        self.progress_queue = None
+        self.executor = None
+        self.http_server = None
+        self.threads = []
+
+    def start(self):
+        """
+        Starts the worker processes and serves requests in background threads.
+
+        Returns
+        -------
+        int containing the port being listened on
+        """
+        self.progress_queue = multiprocessing.Queue()
+        self.num_workers = self.num_workers or os.cpu_count()
+        self.executor = ProcessPoolExecutor(max_workers=self.num_workers, initializer=attach_progress_queue,
+                                            initargs=(self.progress_queue,))
+        for warm_up_future in [self.executor.submit(warm_up) for _ in range(self.num_workers)]:
+            warm_up_future.result()
+
+        self.http_server = ThreadingHTTPServer((self.host, self.port), JobRequestHandler)
+        self.http_server.job_server = self
+        self.port = self.http_server.server_address[1]
+        self.threads = [threading.Thread(target=self.forward_events, daemon=True),
+                        threading.Thread(target=self.http_server.serve_forever, daemon=True)]
+        for thread in self.threads:
+            thread.start()
+        return self.port
+
+    def stop(self):
+        """
+        Stops serving, cancels queued jobs, and waits for running jobs to finish.
+        """
+        self.http_server.shutdown()
+        self.http_server.server_close()
+        self.executor.shutdown(cancel_futures=True)
+        self.progress_queue.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def serve_forever(self):
+        self.start()
+        print("Job server listening on http://" + self.host + ":" + str(self.port) + " with " +
+              str(self.num_workers) + " workers")
+        try:
+            self.threads[1].join()
+        except KeyboardInterrupt:
+            self.stop()
+
+    def forward_events(self):
+        """
+        Hands events from the workers to their jobs until stop() is called.
+        """
+        while (event := self.progress_queue.get()) is not None:
+            job = self.find_job(event["job_id"])
+            if job is not None:
+                job.add_event(event)
+
+    def find_job(self, job_id):
+        with self.jobs_lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        with self.jobs_lock:
+            return list(self.jobs.values())
+
+    def submit(self, config, progress_interval=10):
+        """
+        Parameters
+        ----------
+        config: dictionary in the format of the arguments file
+        progress_interval: int containing the number of iterations between progress events
+
+        Returns
+        -------
+        Job which has been queued
+        """
+        arguments = InputHandling(config)
+        arguments.parse_arguments()
+        optimization_arguments, swarm_arguments = prepare_worker_arguments(arguments.optimization_arguments,
+                                                                           arguments.swarm_initiation_arguments)
+        with self.jobs_lock:
+            job = Job(next(self.job_ids))
+            self.jobs[job.id] = job
+            finished_jobs = [old_job.id for old_job in self.jobs.values() if old_job.finished]
+            for old_job_id in finished_jobs[:max(0, len(finished_jobs) - self.max_finished_jobs)]:
+                del self.jobs[old_job_id]
+
+        future = self.executor.submit(run_job, job.id, optimization_arguments, swarm_arguments, progress_interval)
+        future.add_done_callback(lambda done_future: self.report_failure(job, done_future))
+        return job
+
+    @staticmethod
+    def report_failure(job, future):
+        if future.cancelled():
+            job.add_event({"job_id": job.id, "event": "error", "error": "Cancelled"})
+        elif future.exception() is not None:
+            job.add_event({"job_id": job.id, "event": "error", "error": repr(future.exception())})
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+
+    def send_json(self, status, body):
+        data = (json.dumps(body) + "\n").encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def find_requested_job(self, job_id):
+        job = self.server.job_server.find_job(int(job_id)) if job_id.isdigit() else None
+        if job is None:
+            self.send_json(404, {"error": "No job " + job_id})
+        return job
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip("/") != "/jobs":
+            self.send_json(404, {"error": "Jobs are posted to /jobs"})
+            return
+
+        try:
+            config = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            progress_interval = int(parse_qs(url.query).get("progress_interval", ["10"])[0])
+            if not isinstance(config, dict) or progress_interval <= 0:
+                raise ArgumentException("Job must be an arguments dictionary and progress_interval must be positive.")
+            job = self.server.job_server.submit(config, progress_interval)
+        except (ValueError, ArgumentException) as error:
+            self.send_json(400, {"error": str(error)})
+            return
+
+        self.send_json(202, job.summarize())
+
+    def do_GET(self):
+        path = urlsplit(self.path).path.strip("/").split("/")
+        if path == ["jobs"]:
+            self.send_json(200, [job.summarize() for job in self.server.job_server.list_jobs()])
+        elif len(path) == 2 and path[0] == "jobs":
+            job = self.find_requested_job(path[1])
+            if job is not None:
+                self.send_json(200, job.summarize())
+        elif len(path) == 3 and path[0] == "jobs" and path[2] == "events":
+            job = self.find_requested_job(path[1])
+            if job is not None:
+                self.stream_events(job)
+        else:
+            self.send_json(404, {"error": "Unknown path " + self.path})
+
+    def stream_events(self, job):
+        """
+        Sends each event of job as a line of JSON as soon as it arrives, closing the connection when the job finishes.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            for event in job.iterate_events():
+                self.wfile.write((json.dumps(event) + "\n").encode())
+                self.wfile.flush()
+        except ConnectionError:
+            # The client stopped listening, the job carries on
+            pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve optimization jobs over local HTTP from a pool of warm workers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes.  Defaults to the number of CPU cores.")
+    command_line_arguments = parser.parse_args()
+    JobServer(command_line_arguments.host, command_line_arguments.port, command_line_arguments.workers).serve_forever()
@@ -0,0 +1,16 @@
+import os
+
+
+# Hot loops of an iteration, from the compiled kernels_c module when it has been built with
+# `python setup.py build_ext --inplace`, and from the pure python kernels_py module otherwise.  Setting the
+# PSO_KERNELS environment variable to "python" uses kernels_py even when kernels_c is built.
+if os.environ.get("PSO_KERNELS") == "python":
+    from kernels_py import *
+    backend = "python"
+else:
+    try:
+        from kernels_c import *
+        backend = "cython"
+    except ImportError:
+        from kernels_py import *
+        backend = "python"
@@ -0,0 +1,236 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, initializedcheck=False, cdivision=True
+import itertools
+import numpy as np
+from cython cimport floating
+from libc.math cimport sqrt, fmod
+
+
+# Typed Cython implementations of the functions in kernels_py.py, with the same arguments and results.  Each loops over
+# the particles once without the temporary arrays the numpy versions need.  Positions, velocities, and scores may be
+# either np.double or np.single, as long as every floating point argument of a call has the same type.  Sums are
+# accumulated as doubles either way.
+
+__all__ = ["move_particles", "find_max_displacement", "find_within_radius", "find_pairs_brute_force",
+           "find_pairs_in_cell_grid", "find_best_neighbors", "center_neighborhoods", "accumulate_normal_equations",
+           "find_sum_squared_residuals"]
+
+
+cdef class PairBuffer:
+    """
+    Growable pair of np.intp arrays to collect (row, column) pairs into when their number is not known in advance
+    """
+    cdef Py_ssize_t size
+    cdef object rows_array, columns_array
+    cdef Py_ssize_t[::1] rows, columns
+
+    def __cinit__(self, Py_ssize_t capacity):
+        self.size = 0
+        self.rows_array = np.empty(max(capacity, 16), dtype=np.intp)
+        self.columns_array = np.empty(max(capacity, 16), dtype=np.intp)
+        self.rows = self.rows_array
+        self.columns = self.columns_array
+
+    cdef int append(self, Py_ssize_t row, Py_ssize_t column) except -1:
+        if self.size == self.rows.shape[0]:
+            self.rows_array = np.resize(self.rows_array, 2 * self.size)
+            self.columns_array = np.resize(self.columns_array, 2 * self.size)
+            self.rows = self.rows_array
+            self.columns = self.columns_array
+        self.rows[self.size] = row
+        self.columns[self.size] = column
+        self.size += 1
+        return 0
+
+    def to_arrays(self):
+        return self.rows_array[:self.size].copy(), self.columns_array[:self.size].copy()
+
+
+cdef inline double find_distance(const floating[:, ::1] positions, Py_ssize_t row, Py_ssize_t column):
+    cdef Py_ssize_t dimension
+    cdef double difference, sum_of_squares = 0
+    for dimension in range(positions.shape[1]):
+        difference = positions[column, dimension] - positions[row, dimension]
+        sum_of_squares += difference * difference
+    return sqrt(sum_of_squares)
+
+
+cdef inline Py_ssize_t search_sorted(const Py_ssize_t[::1] values, Py_ssize_t value, bint right):
+    """
+    Same as np.searchsorted(values, value, side="right" if right else "left")
+    """
+    cdef Py_ssize_t low = 0, high = values.shape[0], middle
+    while low < high:
+        middle = (low + high) // 2
+        if values[middle] < value or (right and values[middle] == value):
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def move_particles(floating[:, ::1] positions, const floating[:, ::1] velocities):
+    cdef Py_ssize_t particle, dimension
+    cdef floating position
+    for particle in range(positions.shape[0]):
+        for dimension in range(positions.shape[1]):
+            position = positions[particle, dimension] + velocities[particle, dimension]
+            if position < 0:
+                position = fmod(-position, 1)
+            elif position > 1:
+                position = 1 - fmod(position - 1, 1)
+            positions[particle, dimension] = position
+
+
+def find_max_displacement(const floating[:, ::1] positions, const floating[:, ::1] reference_positions):
+    cdef Py_ssize_t particle, dimension
+    cdef double difference, sum_of_squares, max_sum_of_squares = 0
+    for particle in range(positions.shape[0]):
+        sum_of_squares = 0
+        for dimension in range(positions.shape[1]):
+            difference = positions[particle, dimension] - reference_positions[particle, dimension]
+            sum_of_squares += difference * difference
+        if sum_of_squares > max_sum_of_squares:
+            max_sum_of_squares = sum_of_squares
+    return np.double(sqrt(max_sum_of_squares))
+
+
+def find_within_radius(const floating[:, ::1] positions, const Py_ssize_t[::1] rows, const Py_ssize_t[::1] columns,
+                       double radius):
+    within_radius_array = np.empty(rows.shape[0], dtype=np.bool_)
+    cdef unsigned char[::1] within_radius = within_radius_array.view(np.uint8)
+    cdef Py_ssize_t pair
+    for pair in range(rows.shape[0]):
+        within_radius[pair] = find_distance(positions, rows[pair], columns[pair]) < radius
+    return within_radius_array
+
+
+def find_pairs_brute_force(const floating[:, ::1] positions, double radius, Py_ssize_t first_particle=0,
+                           last_particle=None, block_size=2 ** 20):
+    # block_size only limits the memory of the numpy version, this one never holds more than the pairs found
+    cdef Py_ssize_t row, column, num_particles = positions.shape[0]
+    cdef Py_ssize_t end_particle = num_particles if last_particle is None else last_particle
+    cdef PairBuffer pairs = PairBuffer(4 * (end_particle - first_particle))
+    for row in range(first_particle, end_particle):
+        for column in range(num_particles):
+            if find_distance(positions, row, column) < radius:
+                pairs.append(row, column)
+    return pairs.to_arrays()
+
+
+def find_pairs_in_cell_grid(const floating[:, ::1] positions, const Py_ssize_t[:, ::1] cell_coordinates,
+                            Py_ssize_t cells_per_dimension, const Py_ssize_t[::1] sorted_particle_ids,
+                            const Py_ssize_t[::1] sorted_cell_ids, double radius, Py_ssize_t first_particle=0,
+                            last_particle=None):
+    cdef Py_ssize_t num_dimensions = positions.shape[1]
+    cdef Py_ssize_t end_particle = positions.shape[0] if last_particle is None else last_particle
+    cdef Py_ssize_t[:, ::1] offsets = np.array(list(itertools.product((-1, 0, 1), repeat=num_dimensions)),
+                                               dtype=np.intp).reshape(-1, num_dimensions)
+    cdef Py_ssize_t particle, offset, dimension, coordinate, cell_id, stride, candidate, end, neighbor
+    cdef bint in_grid
+    cdef PairBuffer pairs = PairBuffer(8 * (end_particle - first_particle))
+    for particle in range(first_particle, end_particle):
+        for offset in range(offsets.shape[0]):
+            in_grid = True
+            cell_id = 0
+            stride = 1
+            for dimension in range(num_dimensions):
+                coordinate = cell_coordinates[particle, dimension] + offsets[offset, dimension]
+                if coordinate < 0 or coordinate >= cells_per_dimension:
+                    in_grid = False
+                    break
+                cell_id += coordinate * stride
+                stride *= cells_per_dimension
+            if not in_grid:
+                continue
+
+            end = search_sorted(sorted_cell_ids, cell_id, True)
+            for candidate in range(search_sorted(sorted_cell_ids, cell_id, False), end):
+                neighbor = sorted_particle_ids[candidate]
+                if find_distance(positions, particle, neighbor) < radius:
+                    pairs.append(particle, neighbor)
+    return pairs.to_arrays()
+
+
+def find_best_neighbors(const floating[::1] scores, const Py_ssize_t[::1] indptr, const Py_ssize_t[::1] indices,
+                        bint find_max):
+    cdef Py_ssize_t num_neighborhoods = indptr.shape[0] - 1
+    best_ids_array = np.empty(num_neighborhoods, dtype=np.intp)
+    cdef Py_ssize_t[::1] best_ids = best_ids_array
+    cdef Py_ssize_t neighborhood, entry, best
+    for neighborhood in range(num_neighborhoods):
+        best = indices[indptr[neighborhood]]
+        for entry in range(indptr[neighborhood] + 1, indptr[neighborhood + 1]):
+            if (scores[indices[entry]] > scores[best]) if find_max else (scores[indices[entry]] < scores[best]):
+                best = indices[entry]
+        best_ids[neighborhood] = best
+    return best_ids_array
+
+
+def center_neighborhoods(const floating[:, ::1] positions, const floating[::1] scores, const Py_ssize_t[::1] indptr,
+                         const Py_ssize_t[::1] indices):
+    cdef Py_ssize_t num_dimensions = positions.shape[1], num_neighbors = indices.shape[0]
+    float_type = np.float64 if floating is double else np.float32
+    position_differences_array = np.empty((num_neighbors, num_dimensions), dtype=float_type)
+    score_differences_array = np.empty(num_neighbors, dtype=float_type)
+    mean_position_array = np.empty(num_dimensions, dtype=np.double)
+    cdef floating[:, ::1] position_differences = position_differences_array
+    cdef floating[::1] score_differences = score_differences_array
+    cdef double[::1] mean_position = mean_position_array
+    cdef double mean_score, count
+    cdef Py_ssize_t neighborhood, entry, dimension, neighbor
+    for neighborhood in range(indptr.shape[0] - 1):
+        count = indptr[neighborhood + 1] - indptr[neighborhood]
+        mean_position[:] = 0
+        mean_score = 0
+        for entry in range(indptr[neighborhood], indptr[neighborhood + 1]):
+            neighbor = indices[entry]
+            for dimension in range(num_dimensions):
+                mean_position[dimension] += positions[neighbor, dimension]
+            mean_score += scores[neighbor]
+        for dimension in range(num_dimensions):
+            mean_position[dimension] /= count
+        mean_score /= count
+
+        for entry in range(indptr[neighborhood], indptr[neighborhood + 1]):
+            neighbor = indices[entry]
+            for dimension in range(num_dimensions):
+                position_differences[entry, dimension] = positions[neighbor, dimension] - mean_position[dimension]
+            score_differences[entry] = scores[neighbor] - mean_score
+    return position_differences_array, score_differences_array
+
+
+def accumulate_normal_equations(const floating[:, ::1] position_differences, const floating[::1] score_differences,
+                                const Py_ssize_t[::1] indptr):
+    cdef Py_ssize_t num_neighborhoods = indptr.shape[0] - 1, num_dimensions = position_differences.shape[1]
+    a_array = np.zeros((num_neighborhoods, num_dimensions, num_dimensions), dtype=np.double)
+    b_array = np.zeros((num_neighborhoods, num_dimensions), dtype=np.double)
+    cdef double[:, :, ::1] a = a_array
+    cdef double[:, ::1] b = b_array
+    cdef Py_ssize_t neighborhood, entry, row, column
+    for neighborhood in range(num_neighborhoods):
+        for entry in range(indptr[neighborhood], indptr[neighborhood + 1]):
+            for row in range(num_dimensions):
+                for column in range(num_dimensions):
+                    a[neighborhood, row, column] += <double> position_differences[entry, row] * \
+                                                    position_differences[entry, column]
+                b[neighborhood, row] += <double> position_differences[entry, row] * score_differences[entry]
+    return a_array, b_array
+
+
+def find_sum_squared_residuals(const floating[:, ::1] position_differences, const floating[::1] score_differences,
+                               const double[:, :] gradients, const Py_ssize_t[::1] indptr):
+    cdef Py_ssize_t num_neighborhoods = indptr.shape[0] - 1
+    sum_squared_residuals_array = np.zeros(num_neighborhoods, dtype=np.double)
+    sum_squared_score_differences_array = np.zeros(num_neighborhoods, dtype=np.double)
+    cdef double[::1] sum_squared_residuals = sum_squared_residuals_array
+    cdef double[::1] sum_squared_score_differences = sum_squared_score_differences_array
+    cdef double residual
+    cdef Py_ssize_t neighborhood, entry, dimension
+    for neighborhood in range(num_neighborhoods):
+        for entry in range(indptr[neighborhood], indptr[neighborhood + 1]):
+            residual = score_differences[entry]
+            for dimension in range(position_differences.shape[1]):
+                residual -= position_differences[entry, dimension] * gradients[neighborhood, dimension]
+            sum_squared_residuals[neighborhood] += residual * residual
+            sum_squared_score_differences[neighborhood] += <double> score_differences[entry] * score_differences[entry]
+    return sum_squared_residuals_array, sum_squared_score_differences_array
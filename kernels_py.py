@@ -0,0 +1,220 @@
+import itertools
+import numpy as np
+from math_functions import find_hypotenuses, reflect_into_unit_interval
+
+
+# Pure python (numpy) implementations of the hot loops of an iteration.  kernels_c.pyx implements the same functions
+# with the same arguments and results as typed Cython, and kernels.py picks whichever is available.
+
+__all__ = ["move_particles", "find_max_displacement", "find_within_radius", "find_pairs_brute_force",
+           "find_pairs_in_cell_grid", "find_best_neighbors", "center_neighborhoods", "accumulate_normal_equations",
+           "find_sum_squared_residuals"]
+
+
+def move_particles(positions, velocities):
+    """
+    Moves every particle by its velocity, in place, reflecting positions that pass outside of [0, 1] back off of the
+    boundary they crossed
+
+    Parameters
+    ----------
+    positions: (num_particles, num_dimensions) size array of normalized particle positions, updated in place
+    velocities: (num_particles, num_dimensions) size array of particle velocities
+    """
+    positions[:] = reflect_into_unit_interval(positions + velocities)
+
+
+def find_max_displacement(positions, reference_positions):
+    """
+    Returns
+    -------
+    np.double containing the furthest distance any particle is from its reference position, 0 with no particles
+    """
+    return np.double(find_hypotenuses(positions - reference_positions).max(initial=0))
+
+
+def find_within_radius(positions, rows, columns, radius):
+    """
+    Returns
+    -------
+    (num_pairs) size array of bools, True where particle rows[i] is closer than radius to particle columns[i]
+    """
+    return find_hypotenuses(positions[columns] - positions[rows]) < radius
+
+
+def find_pairs_brute_force(positions, radius, first_particle=0, last_particle=None, block_size=2 ** 20):
+    """
+    Finds every pair of particles closer than radius by checking all pairs, a block of rows at a time so that no more
+    than about block_size distances are held at once.  Each particle is paired with itself.  Only the pairs of particles
+    first_particle to last_particle with every other particle are found, so a swarm can be searched a chunk at a time.
+
+    Returns
+    -------
+    rows, columns: (num_pairs) size arrays of np.intp containing the particle ids of each pair, in no particular order
+    """
+    num_particles = len(positions)
+    last_particle = num_particles if last_particle is None else last_particle
+    rows_per_block = max(1, block_size // max(num_particles, 1))
+    rows = [np.zeros(0, dtype=np.intp)]
+    columns = [np.zeros(0, dtype=np.intp)]
+    for block_start in range(first_particle, last_particle, rows_per_block):
+        block = positions[block_start:min(block_start + rows_per_block, last_particle)]
+        distances = find_hypotenuses(block[:, np.newaxis, :] - positions[np.newaxis, :, :])
+        block_rows, block_columns = np.nonzero(distances < radius)
+        rows.append(block_rows + block_start)
+        columns.append(block_columns)
+
+    return np.concatenate(rows), np.concatenate(columns)
+
+
+def expand_ranges(starts, ends):
+    """
+    Lists every integer in the half open ranges [starts[i], ends[i]) in a single array
+
+    Returns
+    -------
+    owners: array containing i for each returned value
+    values: array containing the concatenated ranges
+    """
+    counts = ends - starts
+    owners = np.repeat(np.arange(len(starts)), counts)
+    values = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - starts, counts)
+    return owners, values
+
+
+def find_pairs_in_cell_grid(positions, cell_coordinates, cells_per_dimension, sorted_particle_ids, sorted_cell_ids,
+                            radius, first_particle=0, last_particle=None):
+    """
+    Finds every pair of particles closer than radius by only checking the particles in the same and adjacent cells of a
+    neighbor_search.CellGrid, one offset to an adjacent cell at a time.  Only the pairs of particles first_particle to
+    last_particle with every other particle are found.
+
+    Parameters
+    ----------
+    positions: (num_particles, num_dimensions) size array of normalized particle positions
+    cell_coordinates: (num_particles, num_dimensions) size array of np.intp containing each particle's cell along each
+        axis
+    cells_per_dimension: int containing the number of cells along each axis
+    sorted_particle_ids: (num_particles) size array of np.intp containing the particle ids ordered by cell id
+    sorted_cell_ids: (num_particles) size array of np.intp containing the cell id of each particle in
+        sorted_particle_ids
+    radius: np.double no larger than the cell width
+    first_particle, last_particle: ints containing the range of particles to find the pairs of, every particle by
+        default
+
+    Returns
+    -------
+    rows, columns: (num_pairs) size arrays of np.intp containing the particle ids of each pair, in no particular order
+    """
+    num_dimensions = positions.shape[1]
+    strides = cells_per_dimension ** np.arange(num_dimensions, dtype=np.intp)
+    query_coordinates = cell_coordinates[first_particle:last_particle]
+    rows = []
+    columns = []
+    for offset in itertools.product((-1, 0, 1), repeat=num_dimensions):
+        adjacent_coordinates = query_coordinates + np.array(offset)
+        in_grid = np.all((adjacent_coordinates >= 0) & (adjacent_coordinates < cells_per_dimension), axis=1)
+        particle_ids = np.flatnonzero(in_grid) + first_particle
+        adjacent_cell_ids = adjacent_coordinates[in_grid] @ strides
+        starts = np.searchsorted(sorted_cell_ids, adjacent_cell_ids, side="left")
+        ends = np.searchsorted(sorted_cell_ids, adjacent_cell_ids, side="right")
+        owners, candidates = expand_ranges(starts, ends)
+        from_ids = particle_ids[owners]
+        to_ids = sorted_particle_ids[candidates]
+        within_radius = find_within_radius(positions, from_ids, to_ids, radius)
+        rows.append(from_ids[within_radius])
+        columns.append(to_ids[within_radius])
+
+    return np.concatenate(rows), np.concatenate(columns)
+
+
+def find_best_neighbors(scores, indptr, indices, find_max):
+    """
+    Finds the best scoring particle of every neighborhood of a neighbor list
+
+    Parameters
+    ----------
+    scores: (num_particles) size array of particle scores
+    indptr: (num_neighborhoods + 1) size array of np.intp containing the start of each neighborhood in indices, with
+        indptr[0] == 0 and no empty neighborhoods
+    indices: (indptr[-1]) size array of np.intp containing the particle ids in each neighborhood
+    find_max: bool, True to find the highest score and False to find the lowest
+
+    Returns
+    -------
+    (num_neighborhoods) size array of np.intp containing the id of the best particle of each neighborhood, the first in
+        indices of any ties
+    """
+    starts = indptr[:-1]
+    neighbor_scores = scores[indices]
+    best_scores = (np.maximum if find_max else np.minimum).reduceat(neighbor_scores, starts)
+    rows = np.repeat(np.arange(len(starts)), np.diff(indptr))
+    best_entries = np.where(neighbor_scores == best_scores[rows], np.arange(len(indices)), len(indices))
+    return indices[np.minimum.reduceat(best_entries, starts)]
+
+
+def center_neighborhoods(positions, scores, indptr, indices):
+    """
+    Centers the positions and scores of every neighborhood of a neighbor list on the neighborhood's means
+
+    Parameters
+    ----------
+    positions: (num_particles, num_dimensions) size array of normalized particle positions
+    scores: (num_particles) size array of particle scores
+    indptr: (num_neighborhoods + 1) size array of np.intp containing the start of each neighborhood in indices, with
+        indptr[0] == 0 and no empty neighborhoods
+    indices: (indptr[-1]) size array of np.intp containing the particle ids in each neighborhood
+
+    Returns
+    -------
+    position_differences: (indptr[-1], num_dimensions) size array of the positions minus their neighborhood's mean, of
+        the positions' dtype.  The means are accumulated as np.doubles
+    score_differences: (indptr[-1]) size array of the scores minus their neighborhood's mean, of the scores' dtype
+    """
+    starts = indptr[:-1]
+    counts = np.diff(indptr)
+    rows = np.repeat(np.arange(len(counts)), counts)
+    neighbor_positions = positions[indices]
+    neighbor_scores = scores[indices]
+    mean_positions = np.add.reduceat(neighbor_positions, starts, axis=0, dtype=np.double) / counts[:, np.newaxis]
+    mean_scores = np.add.reduceat(neighbor_scores, starts, dtype=np.double) / counts
+    return (neighbor_positions - mean_positions[rows]).astype(positions.dtype, copy=False), \
+        (neighbor_scores - mean_scores[rows]).astype(scores.dtype, copy=False)
+
+
+def accumulate_normal_equations(position_differences, score_differences, indptr):
+    """
+    Returns
+    -------
+    a: (num_neighborhoods, num_dimensions, num_dimensions) size array of np.doubles containing
+        sum((Xi - Xavg) * (Xi - Xavg) ^ T) over each neighborhood
+    b: (num_neighborhoods, num_dimensions) size array of np.doubles containing sum((zi - zavg) * (Xi - Xavg)) over each
+        neighborhood
+    """
+    starts = indptr[:-1]
+    position_differences = position_differences.astype(np.double, copy=False)
+    score_differences = score_differences.astype(np.double, copy=False)
+    a = np.add.reduceat(position_differences[:, :, np.newaxis] * position_differences[:, np.newaxis, :], starts, axis=0)
+    b = np.add.reduceat(position_differences * score_differences[:, np.newaxis], starts, axis=0)
+    return a, b
+
+
+def find_sum_squared_residuals(position_differences, score_differences, gradients, indptr):
+    """
+    Parameters
+    ----------
+    gradients: (num_neighborhoods, num_dimensions) size array of np.doubles
+
+    Returns
+    -------
+    sum_squared_residuals: (num_neighborhoods) size array of np.doubles containing the sum of the squared residuals of
+        each neighborhood's centered scores from its plane through the origin with slopes gradients
+    sum_squared_score_differences: (num_neighborhoods) size array of np.doubles containing the sum of the squared
+        centered scores of each neighborhood
+    """
+    starts = indptr[:-1]
+    position_differences = position_differences.astype(np.double, copy=False)
+    score_differences = score_differences.astype(np.double, copy=False)
+    rows = np.repeat(np.arange(len(starts)), np.diff(indptr))
+    residuals = score_differences - (position_differences * gradients[rows]).sum(axis=1)
+    return np.add.reduceat(residuals ** 2, starts), np.add.reduceat(score_differences ** 2, starts)
@@ -1,17 +1,23 @@
 # Author: Julian Pryde
-from swarm_c import Swarm
+from swarm import Swarm
+import argparse
 import json
 from input_handling import InputHandling
-from pso_timing import PSOTiming
+from simulation_server import create_objective
+from checkpoint import CheckpointWriter, capture_run_state, load_checkpoint, restore_run_state
+from telemetry import TelemetryRecorder
+from trajectory import TrajectoryRecorder
+from pso_timing import PSOTiming, PhaseTimers
 from math_functions import find_hypotenuse
-import yappi
 import datetime
+import os
 import numpy as np
 
 
-def initialize_timing():
+def initialize_timing(profile=False):
     """
-    Initializes both timing applications. PSO Timing simply times the total wall clock time that the program ran for.
+    Initializes timing. PSO Timing simply times the total wall clock time that the program ran for.  With profile set,
+        yappi CPU profiling of every function is started as well, which slows the run down considerably.
 
     Returns
     -------
@@ -19,8 +25,10 @@ def initialize_timing():
     """
     pso_timing = PSOTiming()
     pso_timing.start()
-    yappi.set_clock_type("cpu")
-    yappi.start()
+    if profile:
+        import yappi
+        yappi.set_clock_type("cpu")
+        yappi.start()
 
     return pso_timing
 
@@ -34,12 +42,10 @@ def initialize_run_values():
     All set values
     """
     iteration = 0
-    high_particle_velocity_counter = 0
     iterations_with_same_best_particle_counter = 0
     old_best_particle = 0
     mean_r_squared = 0
-    return high_particle_velocity_counter, iteration, iterations_with_same_best_particle_counter, mean_r_squared, \
-        old_best_particle
+    return iteration, iterations_with_same_best_particle_counter, mean_r_squared, old_best_particle
 
 
 def test_exit_criteria(optimization_arguments, most_movement, iterations_with_same_best_particle, iteration, mean_r2):
@@ -95,45 +101,56 @@ def format_data_for_printing(dictionary):
     return dictionary
 
 
-def save_timing_report(pso_timing, optimization_arguments, swarm_arg_dict):
+def save_timing_report(pso_timing, optimization_arguments, swarm_arg_dict, phase_timers, profile=False):
     """
-    Saves the profile and timing information in a file
+    Saves the timing information, and the profile if profiling, in a file in the timereports directory
 
     Parameters
     ----------
     pso_timing: PSOTiming object to carry through
     optimization_arguments: arguments for printing at the top of the timing report
     swarm_arg_dict: arguments for printing at the top of the timing report
+    phase_timers: PhaseTimers of the run, only reported if enabled
+    profile: bool, True if yappi was started by initialize_timing
     """
 
     pso_timing.end()
     print(pso_timing.report())
+    if phase_timers.enabled:
+        print(phase_timers.report())
     time_format = '%m_%d_%Y_%H%M%S'
-    time_file_name = 'timereports/' + datetime.datetime.now().strftime(time_format)
+    os.makedirs('timereports', exist_ok=True)
+    time_file_name = os.path.join('timereports', datetime.datetime.now().strftime(time_format))
     optimization_arguments = format_data_for_printing(optimization_arguments)
     swarm_arg_dict = format_data_for_printing(swarm_arg_dict)
     with open(time_file_name, 'w+') as timing_data_file:
         arguments_string = "Optimization Arguments: " + json.dumps(optimization_arguments, indent=4) + \
             "\nSwarm Arguments: " + json.dumps(swarm_arg_dict, indent=4) + "\n"
         timing_data_file.write(arguments_string)
-        timing_data_file.write(pso_timing.report())
-        yappi.get_func_stats().print_all(out=timing_data_file,
-                                         columns={
-                                             0: ("name", 110),
-                                             1: ("ncall", 10),
-                                             2: ("tsub", 8),
-                                             3: ("ttot", 8),
-                                             4: ("tavg", 8)
-                                         })
-
-
-def find_best_particle(iterations_with_same_best_particle_counter, optimization_arguments):
+        timing_data_file.write(pso_timing.report() + "\n")
+        if phase_timers.enabled:
+            timing_data_file.write(phase_timers.report() + "\n")
+        if profile:
+            import yappi
+            yappi.stop()
+            yappi.get_func_stats().print_all(out=timing_data_file,
+                                             columns={
+                                                 0: ("name", 110),
+                                                 1: ("ncall", 10),
+                                                 2: ("tsub", 8),
+                                                 3: ("ttot", 8),
+                                                 4: ("tavg", 8)
+                                             })
+
+
+def find_best_particle(particle_swarm, iterations_with_same_best_particle_counter, optimization_arguments):
     """
     Sets the best_particle, best_particle_id, and previous_best_particle values in particle_swarm, increments
         iterations_with_same_best_particle if the best particle is the same.
 
     Parameters
     ----------
+    particle_swarm: Swarm object being optimized
     iterations_with_same_best_particle_counter: int containing number of iterations have occurred with the same best
         particle
     optimization_arguments
@@ -142,7 +159,7 @@ def find_best_particle(iterations_with_same_best_particle_counter, optimization_
     -------
     iterations_with_same_best_particle_counter
     """
-    same_best_particle_as_last_iteration_flag = swarm.find_best_particle(optimization_arguments['function'])
+    same_best_particle_as_last_iteration_flag = particle_swarm.find_best_particle(optimization_arguments['function'])
     if same_best_particle_as_last_iteration_flag:
         iterations_with_same_best_particle_counter += 1
     else:
@@ -150,9 +167,12 @@ def find_best_particle(iterations_with_same_best_particle_counter, optimization_
     return iterations_with_same_best_particle_counter
 
 
-def optimize(particle_swarm, optimization_arguments, swarm_args):
+def optimize(particle_swarm, optimization_arguments, swarm_args, resume_run_state=None, verbose=True,
+             iteration_callback=None, profile=False):
     """
-    optimize() is the main driver for all PSO actions.
+    optimize() is the main driver for all PSO actions.  Saves a checkpoint every checkpoint_interval iterations when a
+        checkpoint_file is given.  With verbose set to False nothing is printed, recorded, profiled, or written to
+        timereports, so that many runs can share a process, as in ensemble.py.
 
     Parameters
     ----------
@@ -164,65 +184,126 @@ def optimize(particle_swarm, optimization_arguments, swarm_args):
         least_squares_method
         r2_exit_criterion
         run_limit
+        checkpoint_file (optional)
+        checkpoint_interval (optional)
+        telemetry_file, telemetry_format, telemetry_interval, telemetry_buffer_size, telemetry_scores (optional)
+        trajectory_file, trajectory_interval, trajectory_max_particles (optional)
+        phase_timers (optional)
     swarm_args: dictionary containing all other arguments to display in timing report
+    resume_run_state: checkpoint loaded with load_checkpoint() to continue a previous run from, or None to start fresh
+    verbose: bool, False to run without any console, telemetry, trajectory, or timing report output
+    iteration_callback: function called with particle_swarm and the number of iterations completed at the end of every
+        iteration, such as islands.Island.migrate, or None
+    profile: bool, True to profile every function call with yappi and add the profile to the timing report
+
+    Returns
+    -------
+    high_particle_velocity_counter: particle_swarm.high_particle_velocity_counter at the end of the run
+    iterations_with_same_best_particle_counter
+    iteration: the number of iterations run
     """
-    high_particle_velocity_counter, \
-        iteration, \
+    iteration, \
         iterations_with_same_best_particle_counter, \
         mean_r_squared, \
         old_best_particle = initialize_run_values()
-    particle_swarm.find_groups_graphs()
-    particle_swarm.plot_particle_positions()
-    pso_timing = initialize_timing()
+    if resume_run_state is not None:
+        iteration, iterations_with_same_best_particle_counter, mean_r_squared = \
+            restore_run_state(particle_swarm, resume_run_state)
+    checkpoint_writer = None
+    if 'checkpoint_file' in optimization_arguments:
+        checkpoint_writer = CheckpointWriter(optimization_arguments['checkpoint_file'], particle_swarm.state.chunk_size)
+    checkpoint_interval = optimization_arguments.get('checkpoint_interval', 100)
+    phase_timers = PhaseTimers(enabled=optimization_arguments.get('phase_timers', False))
+    if verbose:
+        print("Number of groups: " + str(particle_swarm.find_groups().max(initial=-1) + 1))
+        telemetry = TelemetryRecorder.from_arguments(len(particle_swarm), optimization_arguments,
+                                                     particle_swarm.state.dtype,
+                                                     iteration if resume_run_state is not None else None)
+        trajectory = TrajectoryRecorder.from_arguments(particle_swarm, optimization_arguments,
+                                                       iteration if resume_run_state is not None else None)
+        if trajectory is not None:
+            trajectory.record(particle_swarm, iteration)
+        pso_timing = initialize_timing(profile)
     while test_exit_criteria(optimization_arguments, find_hypotenuse(particle_swarm.fastest_particle.velocity),
                              iterations_with_same_best_particle_counter, iteration, mean_r_squared):
-        particle_swarm.call_forcing_function()
-        particle_swarm.find_local_groups()
-        mean_r_squared = particle_swarm.update_swarm_velocities(
-            optimization_arguments['function'],
-
-            swarm_args['least_squares_method']
-        )
-        particle_swarm.move_particles()
-        particle_swarm.add_randomness_factor()
-        particle_swarm.find_fastest_particle()
-        iterations_with_same_best_particle_counter = find_best_particle(iterations_with_same_best_particle_counter,
-                                                                        optimization_arguments)
+        phase_timers.time("call_forcing_function", particle_swarm.call_forcing_function)
+        phase_timers.time("find_local_groups", particle_swarm.find_local_groups)
+        mean_r_squared = phase_timers.time("update_swarm_velocities",
+                                           particle_swarm.update_swarm_velocities,
+                                           optimization_arguments['function'],
+                                           swarm_args['least_squares_method'])
+        phase_timers.time("move_particles", particle_swarm.move_particles)
+        phase_timers.time("add_randomness_factor", particle_swarm.add_randomness_factor)
+        phase_timers.time("find_fastest_particle", particle_swarm.find_fastest_particle)
+        iterations_with_same_best_particle_counter = phase_timers.time("find_best_particle",
+                                                                       find_best_particle,
+                                                                       particle_swarm,
+                                                                       iterations_with_same_best_particle_counter,
+                                                                       optimization_arguments)
         particle_swarm.simulate_annealing(iteration)
-        particle_swarm.print_summary(iteration)
+        if verbose:
+            telemetry.record(particle_swarm, iteration, mean_r_squared)
         iteration += 1
-        if iteration % 1000 == 0:
-            particle_swarm.plot_particle_positions()
-
-    save_timing_report(pso_timing, optimization_arguments, swarm_args)
-    return high_particle_velocity_counter, iterations_with_same_best_particle_counter
-
-
-def display_final_output(high_particle_velocity_counter, iterations_with_same_best_particle_counter, particle_swarm):
+        if iteration_callback is not None:
+            iteration_callback(particle_swarm, iteration)
+        if verbose and trajectory is not None:
+            trajectory.record(particle_swarm, iteration)
+        if checkpoint_writer is not None and iteration % checkpoint_interval == 0:
+            checkpoint_writer.write(capture_run_state(particle_swarm,
+                                                      iteration,
+                                                      iterations_with_same_best_particle_counter,
+                                                      mean_r_squared))
+
+    if checkpoint_writer is not None:
+        checkpoint_writer.wait()
+    particle_swarm.evaluator.shutdown()
+    if verbose:
+        telemetry.close()
+        if trajectory is not None:
+            trajectory.close(particle_swarm, iteration)
+        save_timing_report(pso_timing, optimization_arguments, swarm_args, phase_timers, profile)
+    return particle_swarm.high_particle_velocity_counter, iterations_with_same_best_particle_counter, iteration
+
+
+def display_final_output(iterations_with_same_best_particle_counter, particle_swarm):
     """
-    Prints final output text to console, prints plot of particle positions if necessary
+    Prints final output text to console.  Particle positions are drawn after the run by render_trajectory.py
 
     Parameters
     ----------
-    high_particle_velocity_counter
     iterations_with_same_best_particle_counter
     particle_swarm
     """
 
-    particle_swarm.plot_particle_positions()
-    particle_swarm.find_groups_graphs()
-    print("Particle high velocity counter: " + str(high_particle_velocity_counter))
-    print("Final Velocity Coefficient: " + str(swarm.velocity_coefficient))
+    print("Number of groups: " + str(particle_swarm.find_groups().max(initial=-1) + 1))
+    print("Particle high velocity counter: " + str(particle_swarm.high_particle_velocity_counter))
+    print("Final Velocity Coefficient: " + str(particle_swarm.velocity_coefficient))
     print("Iterations with the same best particle: " + str(iterations_with_same_best_particle_counter))
+    if particle_swarm.evaluator.cache is not None:
+        print(particle_swarm.evaluator.cache.report())
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Particle swarm optimizer")
+    parser.add_argument("--resume", metavar="CHECKPOINT_FILE", default=None,
+                        help="Continue the run saved in a checkpoint file. The arguments file must match that run.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile every function call with yappi and save the profile in the timing report. "
+                             "Slows the run down considerably.")
+    command_line_arguments = parser.parse_args()
     arguments = InputHandling()
     arguments.print_arguments()
     arguments.parse_arguments()
-    swarm = Swarm(arguments.swarm_initiation_arguments)
-    high_velocity_counter, same_best_particle_counter = optimize(swarm,
-                                                                 arguments.optimization_arguments,
-                                                                 arguments.swarm_initiation_arguments
-                                                                 )
-    display_final_output(high_velocity_counter, same_best_particle_counter, swarm)
+    swarm = Swarm(arguments.swarm_initiation_arguments, create_objective(arguments.swarm_initiation_arguments))
+    run_state = None
+    if command_line_arguments.resume:
+        run_state = load_checkpoint(command_line_arguments.resume,
+                                    swarm.state.chunk_size,
+                                    swarm.state.storage_directory)
+    _, same_best_particle_counter, _ = optimize(swarm,
+                                                arguments.optimization_arguments,
+                                                arguments.swarm_initiation_arguments,
+                                                run_state,
+                                                profile=command_line_arguments.profile
+                                                )
+    display_final_output(same_best_particle_counter, swarm)
@@ -6,8 +6,26 @@ def find_hypotenuse(side_lengths):
     return np.double(math.sqrt(sum(side_lengths ** 2)))
 
 
+def find_hypotenuses(side_lengths):
+    """
+    Row-wise find_hypotenuse() for a (num_particles, num_dimensions) size array
+    """
+    return np.sqrt((side_lengths ** 2).sum(axis=-1))
+
+
 def compute_normalization_factors(limits):
     normalization_b = limits[:, 0]
     normalization_m = limits[:, 1] - limits[:, 0]
 
     return normalization_m, normalization_b
+
+
+def reflect_into_unit_interval(projected_positions):
+    """
+    Reflects any normalized position that has passed outside of [0, 1] back off of the boundary it crossed
+    """
+    return np.where(
+        projected_positions < 0,
+        -projected_positions % 1,
+        np.where(projected_positions > 1, 1 - ((projected_positions - 1) % 1), projected_positions)
+    )
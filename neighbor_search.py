@@ -0,0 +1,411 @@
+import tempfile
+import numpy as np
+import kernels
+from array_storage import create_array, find_chunks
+
+
+class NeighborList:
+    """
+    Compressed sparse row listing of the particles within the local radius of every particle in a swarm.  The ids of
+    the particles within the local radius of particle i are indices[indptr[i]:indptr[i + 1]], in ascending order.  Each
+    particle is within its own local radius.  indptr and indices may be memory-mapped from disk for large swarms, in
+    which case the list is worked through a chunk of particles at a time.
+    """
+
+    def __init__(self, indptr, indices, radius):
+        """
+        self.indptr: (num_particles + 1) size array of np.intp containing the start of each particle's neighbors in
+            self.indices
+
+        self.indices: (total number of neighbors) size array of np.intp containing particle ids
+
+        self.radius: np.double containing the radius the neighbors were found with
+        """
+        self.indptr = indptr
+        self.indices = indices
+        self.radius = radius
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    @property
+    def counts(self):
+        """
+        Returns
+        -------
+        (num_particles) size array of np.intp containing the number of particles within each particle's local radius
+        """
+        return np.diff(self.indptr)
+
+    def neighbors_of(self, particle_id):
+        return self.indices[self.indptr[particle_id]:self.indptr[particle_id + 1]]
+
+    def find_count_range(self, chunk_size=None):
+        """
+        Returns
+        -------
+        min_count, max_count: ints containing the fewest and most particles within any particle's local radius, 0 with
+            no particles
+        """
+        min_counts, max_counts = [], []
+        for particles in find_chunks(len(self), chunk_size):
+            counts = np.diff(self.indptr[particles.start:particles.stop + 1])
+            min_counts.append(counts.min())
+            max_counts.append(counts.max())
+        return int(min(min_counts, default=0)), int(max(max_counts, default=0))
+
+    def get_rows(self, first_particle=0, last_particle=None):
+        """
+        Returns
+        -------
+        (number of neighbors of particles first_particle to last_particle) size array of np.intp containing the particle
+            each entry of self.indices[self.indptr[first_particle]:self.indptr[last_particle]] belongs to
+        """
+        last_particle = len(self) if last_particle is None else last_particle
+        return np.repeat(np.arange(first_particle, last_particle, dtype=np.intp),
+                         np.diff(self.indptr[first_particle:last_particle + 1]))
+
+    def get_neighbors(self, first_particle, last_particle):
+        """
+        Returns
+        -------
+        array of np.intp containing the neighbors of particles first_particle to last_particle, one after the other
+        """
+        return self.indices[self.indptr[first_particle]:self.indptr[last_particle]]
+
+    def filter(self, positions, radius, chunk_size=None, directory=None):
+        """
+        Keeps only the neighbors closer than radius, which must be no larger than self.radius
+
+        Parameters
+        ----------
+        positions: (num_particles, num_dimensions) size array of normalized particle positions
+        radius: np.double
+        chunk_size: int containing the most particles filtered at once, all of them by default
+        directory: str containing the directory to store the filtered list in, or None to keep it in memory
+
+        Returns
+        -------
+        NeighborList
+        """
+        builder = NeighborListBuilder(len(self), radius, directory)
+        for particles in find_chunks(len(self), chunk_size):
+            rows = self.get_rows(particles.start, particles.stop)
+            columns = self.get_neighbors(particles.start, particles.stop)
+            within_radius = kernels.find_within_radius(positions, rows, columns, radius)
+            builder.add_sorted_pairs(particles.start, particles.stop, rows[within_radius], columns[within_radius])
+        return builder.build()
+
+
+class NeighborListBuilder:
+    """
+    Assembles a NeighborList a chunk of particles at a time, in order, so that only the pairs of one chunk are held in
+    memory at once.  With a directory the finished list is memory-mapped from temporary files in it.
+    """
+
+    def __init__(self, num_particles, radius, directory=None):
+        """
+        self.radius: np.double containing the radius the neighbors are found with
+
+        self.indptr: (num_particles + 1) size array of np.intp, filled in as chunks are added
+
+        self.indices_chunks: list of the neighbors of each chunk added, when kept in memory
+
+        self.indices_file: temporary file the neighbors of each chunk are appended to, when stored in a directory
+
+        self.num_neighbors: int containing the number of neighbors added so far
+        """
+        self.radius = radius
+        self.indptr = create_array(num_particles + 1, np.intp, directory)
+        self.indices_chunks = [np.zeros(0, dtype=np.intp)]
+        self.indices_file = None if directory is None else tempfile.TemporaryFile(dir=directory)
+        self.num_neighbors = 0
+
+    def add_pairs(self, first_particle, last_particle, rows, columns):
+        """
+        Adds the unordered (particle, neighbor) pairs of particles first_particle to last_particle, which must follow
+        the particles already added
+        """
+        order = np.lexsort((columns, rows))
+        self.add_sorted_pairs(first_particle, last_particle, rows[order], columns[order])
+
+    def add_sorted_pairs(self, first_particle, last_particle, rows, columns):
+        """
+        Same as add_pairs for pairs already sorted by row and then by column
+        """
+        chunk_indptr = self.indptr[first_particle + 1:last_particle + 1]
+        np.cumsum(np.bincount(rows - first_particle, minlength=last_particle - first_particle), out=chunk_indptr)
+        chunk_indptr += self.num_neighbors
+        if self.indices_file is None:
+            self.indices_chunks.append(columns)
+        else:
+            self.indices_file.write(np.ascontiguousarray(columns, dtype=np.intp).tobytes())
+        self.num_neighbors += len(columns)
+
+    def build(self):
+        """
+        Returns
+        -------
+        NeighborList of the pairs added
+        """
+        if self.indices_file is None:
+            indices = np.concatenate(self.indices_chunks)
+        elif self.num_neighbors == 0:
+            indices = np.zeros(0, dtype=np.intp)
+        else:
+            self.indices_file.flush()
+            indices = np.memmap(self.indices_file, dtype=np.intp, mode="r", shape=(self.num_neighbors,))
+        if self.indices_file is not None:
+            self.indices_file.close()
+        return NeighborList(self.indptr, indices, self.radius)
+
+
+def build_neighbor_list(rows, columns, num_particles, radius):
+    """
+    Builds a NeighborList from unordered (particle, neighbor) pairs
+    """
+    builder = NeighborListBuilder(num_particles, radius)
+    builder.add_pairs(0, num_particles, rows, columns)
+    return builder.build()
+
+
+class CellGrid:
+    """
+    Uniform grid over the normalized [0, 1] axes with cells at least as wide as the largest radius it will be queried
+    with, so every particle within the radius of a particle lies in the same or an adjacent cell.  Particles shaken
+    slightly outside of the normalized axes are binned into the outermost cells, which keeps the search exact.
+    """
+
+    # Largest number of cells a grid is allowed to have so that cell ids fit in an np.intp
+    max_num_cells = 2 ** 62
+
+    def __init__(self, positions, cell_width, chunk_size=None, directory=None):
+        """
+        self.positions: (num_particles, num_dimensions) size array of normalized particle positions
+
+        self.chunk_size: int containing the most particles binned or queried at once, all of them if None
+
+        self.directory: str containing the directory the grid and the neighbor lists it finds are stored in, or None to
+            keep them in memory
+
+        self.cells_per_dimension: number of cells along each axis
+
+        self.cell_coordinates: (num_particles, num_dimensions) size array of each particle's cell along each axis
+
+        self.sorted_particle_ids: particle ids ordered by cell id
+
+        self.sorted_cell_ids: cell id of each particle in self.sorted_particle_ids
+        """
+        self.positions = positions
+        self.chunk_size = chunk_size
+        self.directory = directory
+        num_particles, num_dimensions = positions.shape
+        cells_per_dimension = max(1, int(1 // cell_width))
+        self.cells_per_dimension = min(cells_per_dimension, int(self.max_num_cells ** (1 / num_dimensions)))
+        self.cell_coordinates = create_array(positions.shape, np.intp, directory)
+        cell_ids = create_array(num_particles, np.intp, directory)
+        for particles in find_chunks(num_particles, chunk_size):
+            self.cell_coordinates[particles] = np.clip(
+                np.floor(positions[particles] * self.cells_per_dimension).astype(np.intp), 0,
+                self.cells_per_dimension - 1
+            )
+            cell_ids[particles] = self.find_cell_ids(self.cell_coordinates[particles])
+
+        # The sort is the one step done on the whole swarm at once, which needs two np.intp per particle in memory
+        self.sorted_particle_ids = create_array(num_particles, np.intp, directory)
+        self.sorted_particle_ids[:] = np.argsort(cell_ids, kind="stable")
+        self.sorted_cell_ids = create_array(num_particles, np.intp, directory)
+        for particles in find_chunks(num_particles, chunk_size):
+            self.sorted_cell_ids[particles] = cell_ids[self.sorted_particle_ids[particles]]
+
+    def find_cell_ids(self, cell_coordinates):
+        strides = self.cells_per_dimension ** np.arange(cell_coordinates.shape[1], dtype=np.intp)
+        return cell_coordinates @ strides
+
+    def query(self, radius):
+        """
+        Finds the particles within radius of every particle
+
+        Parameters
+        ----------
+        radius: np.double no larger than the cell width the grid was built with
+
+        Returns
+        -------
+        NeighborList
+        """
+        builder = NeighborListBuilder(len(self.positions), radius, self.directory)
+        for particles in find_chunks(len(self.positions), self.chunk_size):
+            rows, columns = kernels.find_pairs_in_cell_grid(self.positions, self.cell_coordinates,
+                                                            self.cells_per_dimension, self.sorted_particle_ids,
+                                                            self.sorted_cell_ids, radius, particles.start,
+                                                            particles.stop)
+            builder.add_pairs(particles.start, particles.stop, rows, columns)
+        return builder.build()
+
+
+def brute_force_query(positions, radius, chunk_size=None, directory=None, block_size=2 ** 20):
+    """
+    Finds the particles within radius of every particle by checking all pairs, a block of rows at a time.  Used when a
+    cell grid would not prune anything, such as with large radii or many dimensions.
+
+    Returns
+    -------
+    NeighborList
+    """
+    builder = NeighborListBuilder(len(positions), radius, directory)
+    for particles in find_chunks(len(positions), chunk_size):
+        rows, columns = kernels.find_pairs_brute_force(positions, radius, particles.start, particles.stop, block_size)
+        builder.add_pairs(particles.start, particles.stop, rows, columns)
+    return builder.build()
+
+
+def find_connected_components(neighbor_list, chunk_size=None, directory=None):
+    """
+    Labels the groups of particles connected by chains of neighbors using an array based union-find: each round, the
+    root of every group with a neighbor in another group is hooked onto the smaller root, then every particle's parent
+    pointer is jumped to its root.  Only the neighbor list is needed, never an num_particles x num_particles matrix.
+    Each round works through the neighbor list a chunk of particles at a time.  Hooks made by earlier chunks can leave
+    later chunks hooking a particle which is no longer a root, which only moves it to a smaller particle of the same
+    group, so the groups found are the same.
+
+    Parameters
+    ----------
+    neighbor_list: NeighborList
+    chunk_size: int containing the most particles worked on at once, all of them if None
+    directory: str containing the directory to store the labels in, or None to keep them in memory
+
+    Returns
+    -------
+    (num_particles) size array of np.intp containing the group of each particle, numbered from 0 in order of each
+        group's lowest particle id
+    """
+    num_particles = len(neighbor_list)
+    parents = create_array(num_particles, np.intp, directory)
+    for particles in find_chunks(num_particles, chunk_size):
+        parents[particles] = np.arange(particles.start, particles.stop)
+
+    while True:
+        linked = False
+        for particles in find_chunks(num_particles, chunk_size):
+            row_roots = parents[neighbor_list.get_rows(particles.start, particles.stop)]
+            column_roots = parents[neighbor_list.get_neighbors(particles.start, particles.stop)]
+            linking = row_roots != column_roots
+            if np.any(linking):
+                linked = True
+                np.minimum.at(parents,
+                              np.maximum(row_roots[linking], column_roots[linking]),
+                              np.minimum(row_roots[linking], column_roots[linking]))
+        if not linked:
+            break
+
+        jumped = True
+        while jumped:
+            jumped = False
+            for particles in find_chunks(num_particles, chunk_size):
+                grandparents = parents[parents[particles]]
+                jumped |= not np.array_equal(grandparents, parents[particles])
+                parents[particles] = grandparents
+
+    # Every parent is now its group's lowest particle id, the root.  Each root's label is the number of roots before it,
+    # written over parents in place, which is safe since every particle's root comes no later than the particle
+    num_roots = 0
+    for particles in find_chunks(num_particles, chunk_size):
+        chunk_parents = parents[particles].copy()
+        is_root = chunk_parents == np.arange(particles.start, particles.stop)
+        parents[particles][is_root] = num_roots + np.arange(np.count_nonzero(is_root))
+        num_roots += np.count_nonzero(is_root)
+        parents[particles] = parents[chunk_parents]
+    return parents
+
+
+def find_neighbors(positions, radius, chunk_size=None, directory=None):
+    """
+    Finds the particles within radius of every particle in one batched query, using a cell grid when it can prune the
+    search and checking all pairs otherwise.
+
+    Parameters
+    ----------
+    positions: (num_particles, num_dimensions) size array of normalized particle positions
+    radius: np.double local radius
+    chunk_size: int containing the most particles searched from at once, all of them if None
+    directory: str containing the directory to store the neighbor list in, or None to keep it in memory
+
+    Returns
+    -------
+    NeighborList
+    """
+    num_particles, num_dimensions = positions.shape
+    cells_per_dimension = int(1 // radius) if radius > 0 else num_particles
+    if cells_per_dimension < 3 or 3 ** num_dimensions >= num_particles:
+        return brute_force_query(positions, radius, chunk_size, directory)
+
+    return CellGrid(positions, radius, chunk_size, directory).query(radius)
+
+
+class VerletNeighborSearch:
+    """
+    Reuses neighbor lists across iterations.  Neighbors are found out to a radius widened by a skin of
+    skin * radius and the particle positions at that time are kept.  Until a particle has moved more than half of the
+    remaining margin, no two particles can have come within the radius without already being in the widened list, so
+    each query only filters the widened list down to the requested radius.  The list is rebuilt once the margin runs
+    out, including when the requested radius grows into the skin.
+    """
+
+    def __init__(self, skin, chunk_size=None, directory=None):
+        """
+        self.skin: np.double containing the skin width as a fraction of the radius.  0 rebuilds on every query
+
+        self.chunk_size: int containing the most particles searched at once, all of them if None
+
+        self.directory: str containing the directory to store the neighbor lists and reference positions in, or None
+            to keep them in memory
+
+        self.candidates: NeighborList found with the widened radius
+
+        self.reference_positions: particle positions when self.candidates was built
+
+        self.num_builds, self.num_queries: int counters of full neighbor searches and of queries answered
+        """
+        self.skin = skin
+        self.chunk_size = chunk_size
+        self.directory = directory
+        self.candidates = None
+        self.reference_positions = None
+        self.num_builds = 0
+        self.num_queries = 0
+
+    def needs_rebuild(self, positions, radius):
+        if self.candidates is None or len(positions) != len(self.reference_positions):
+            return True
+
+        max_displacement = max((kernels.find_max_displacement(positions[particles], self.reference_positions[particles])
+                                for particles in find_chunks(len(positions), self.chunk_size)), default=0)
+        return radius + 2 * max_displacement >= self.candidates.radius
+
+    def query(self, positions, radius):
+        """
+        Finds the particles within radius of every particle
+
+        Parameters
+        ----------
+        positions: (num_particles, num_dimensions) size array of normalized particle positions
+        radius: np.double local radius
+
+        Returns
+        -------
+        NeighborList
+        """
+        self.num_queries += 1
+        if self.needs_rebuild(positions, radius):
+            # Dropped first so the old list's memory is freed before the new one is built
+            self.candidates = None
+            self.candidates = find_neighbors(positions, radius * (1 + self.skin), self.chunk_size, self.directory)
+            if self.reference_positions is None or self.reference_positions.shape != positions.shape or \
+                    self.reference_positions.dtype != positions.dtype:
+                self.reference_positions = create_array(positions.shape, positions.dtype, self.directory)
+            for particles in find_chunks(len(positions), self.chunk_size):
+                self.reference_positions[particles] = positions[particles]
+            self.num_builds += 1
+
+        return self.candidates.filter(positions, radius, self.chunk_size, self.directory)
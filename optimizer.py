@@ -0,0 +1,148 @@
+# Author: Julian Pryde
+from swarm import Swarm
+import time
+import numpy as np
+from input_handling import InputHandling
+from simulation_server import create_objective
+import main
+
+
+class OptimizationResult:
+    """
+    Outcome of one optimization run.  The best particle is taken from a final scoring of the swarm after the last
+    iteration, so best_score is the score of best_position.
+    """
+
+    def __init__(self, best_position, best_score, group_labels, iterations, converged, num_evaluations, wall_time,
+                 velocity_coefficient, high_particle_velocity_counter, iterations_with_same_best_particle):
+        """
+        self.best_position: (num_dimensions) size np.ndarray of np.doubles containing the raw position of the best
+            particle
+
+        self.best_score: np.double containing the forcing function score of the best particle
+
+        self.group_labels: (num_particles) size np.ndarray of np.intp containing the group of each particle
+
+        self.iterations: int containing the number of iterations run
+
+        self.converged: bool, True if an exit criterion other than the iteration limit stopped the run
+
+        self.num_evaluations: int containing the number of positions scored with the forcing function
+
+        self.wall_time: seconds the run took
+
+        self.velocity_coefficient: np.double containing the velocity coefficient at the end of the run
+
+        self.high_particle_velocity_counter: int containing the number of iterations with particles moving too fast
+
+        self.iterations_with_same_best_particle: int containing the number of iterations in a row the best particle
+            was the same at the end of the run
+        """
+        self.best_position = best_position
+        self.best_score = best_score
+        self.group_labels = group_labels
+        self.iterations = iterations
+        self.converged = converged
+        self.num_evaluations = num_evaluations
+        self.wall_time = wall_time
+        self.velocity_coefficient = velocity_coefficient
+        self.high_particle_velocity_counter = high_particle_velocity_counter
+        self.iterations_with_same_best_particle = iterations_with_same_best_particle
+
+    @property
+    def num_groups(self):
+        return int(self.group_labels.max(initial=-1) + 1)
+
+    def to_dict(self):
+        """
+        Returns
+        -------
+        dictionary of python data types which can be saved as JSON, without the group of every particle
+        """
+        return {
+            "best_score": float(self.best_score),
+            "best_position": self.best_position.tolist(),
+            "iterations": int(self.iterations),
+            "converged": bool(self.converged),
+            "num_groups": self.num_groups,
+            "num_evaluations": int(self.num_evaluations),
+            "wall_time": self.wall_time,
+            "velocity_coefficient": float(self.velocity_coefficient),
+            "high_particle_velocity_counter": int(self.high_particle_velocity_counter),
+            "iterations_with_same_best_particle": int(self.iterations_with_same_best_particle),
+        }
+
+    def __repr__(self):
+        return "OptimizationResult(best_score=" + str(self.best_score) + ", best_position=" + \
+            str(self.best_position) + ", iterations=" + str(self.iterations) + ", num_groups=" + \
+            str(self.num_groups) + ")"
+
+
+def create_result(particle_swarm, optimization_arguments, iterations, iterations_with_same_best_particle, start_time):
+    """
+    Scores the final positions of a finished run, since the best particle has moved since it was last scored, and
+    collects the result.
+
+    Returns
+    -------
+    OptimizationResult
+    """
+    particle_swarm.call_forcing_function()
+    particle_swarm.find_best_particle(optimization_arguments['function'])
+    return OptimizationResult(best_position=particle_swarm.best_particle.calculate_raw_position(),
+                              best_score=np.double(particle_swarm.best_particle.score),
+                              group_labels=particle_swarm.find_groups(),
+                              iterations=iterations,
+                              converged=iterations < optimization_arguments['iteration_limit'],
+                              num_evaluations=particle_swarm.evaluator.num_evaluations,
+                              wall_time=time.perf_counter() - start_time,
+                              velocity_coefficient=particle_swarm.velocity_coefficient,
+                              high_particle_velocity_counter=particle_swarm.high_particle_velocity_counter,
+                              iterations_with_same_best_particle=iterations_with_same_best_particle)
+
+
+def run(optimization_arguments, swarm_arguments, objective=None, iteration_callback=None):
+    """
+    Runs one optimization from arguments already parsed by InputHandling, without printing, plotting, or writing any
+    files.  With no objective, the forcing function or the simulation_server in swarm_arguments is used.  Worker
+    threads, processes, and event loops used for evaluation are shut down before returning, even if the run fails, so
+    runs can be repeated in the same process indefinitely.
+
+    Returns
+    -------
+    OptimizationResult
+    """
+    start_time = time.perf_counter()
+    if objective is None:
+        objective = create_objective(swarm_arguments)
+    particle_swarm = Swarm(swarm_arguments, objective)
+    try:
+        _, iterations_with_same_best_particle, iterations = main.optimize(particle_swarm,
+                                                                          optimization_arguments,
+                                                                          swarm_arguments,
+                                                                          verbose=False,
+                                                                          iteration_callback=iteration_callback)
+        return create_result(particle_swarm, optimization_arguments, iterations, iterations_with_same_best_particle,
+                             start_time)
+    finally:
+        particle_swarm.evaluator.shutdown()
+
+
+def optimize(config, objective=None):
+    """
+    Optimizes objective in-process, for using the optimizer as a library.
+
+    Parameters
+    ----------
+    config: dictionary of arguments in the same format as the arguments file, validated the same way
+    objective: forcing function, either a function of one raw position or of every position at once as described in
+        forcing_function.py, or an async callable for the "async" evaluation executor.  Defaults to the forcing
+        function, or the simulation_server in config
+
+    Returns
+    -------
+    OptimizationResult
+    """
+    arguments = InputHandling(config)
+    arguments.parse_arguments()
+    return run(arguments.optimization_arguments, arguments.swarm_initiation_arguments, objective)
@@ -1,6 +1,7 @@
 import numpy as np
 from matplotlib import pyplot
 import forcing_function
+from contour_cache import load_contour_grid
 
 
 # def convert_multi_dimension_list_to_floats(list_to_become_floats):
@@ -15,6 +16,9 @@ import forcing_function
 
 
 class PlotParticles:
+    # Directory forcing function grids for contour overlays are cached in, see contour_cache.load_contour_grid
+    contour_cache_directory = ".contour_cache"
+
     def __init__(self, limits, particle_list):
         self.limits = limits
         self.particle_list = particle_list
@@ -48,10 +52,8 @@ class PlotParticles:
         levels = None
         delta = 0.025
         if len(self.limits) == 2:
-            x = np.arange(self.limits[0][0] + 0.025, self.limits[0][1], delta)
-            y = np.arange(self.limits[1][0] + 0.025, self.limits[1][1], delta)
-            x, y = np.meshgrid(x, y)
-            z = forcing_function.forcing_function([x, y])
+            x, y, z = load_contour_grid(forcing_function.forcing_function, self.limits, delta,
+                                        self.contour_cache_directory)
             max_z = np.max(z)
             min_z = np.min(z)
             levels = np.arange(min_z, max_z, (max_z - min_z) / np.int_(30))
@@ -1,4 +1,4 @@
-from time import perf_counter
+from time import perf_counter, perf_counter_ns
 
 
 class PSOTiming:
@@ -15,3 +15,82 @@ class PSOTiming:
 
     def report(self):
         return "Total time: " + str(self.time) + " seconds"
+
+
+# Phases of an iteration of main.optimize, in the order they run
+optimization_phases = ("call_forcing_function", "find_local_groups", "update_swarm_velocities", "move_particles",
+                       "add_randomness_factor", "find_fastest_particle", "find_best_particle")
+
+
+class PhaseTimers:
+    """
+    Wall clock timers for each phase of an optimization iteration.  Timing a phase only costs two clock reads and a few
+    integer additions, so they can be left on for production runs.  Besides totals, each phase keeps a histogram of
+    its durations in power of two buckets of microseconds, so that occasional slow iterations stand out.  When
+    disabled, phases are run without being timed.
+    """
+
+    # Bucket k counts durations of at least 2 ** (k - 1) and less than 2 ** k microseconds, bucket 0 those under 1
+    num_buckets = 40
+
+    def __init__(self, phases=optimization_phases, enabled=True):
+        """
+        self.enabled: bool, False to run phases without timing them
+
+        self.totals: dictionary of the total nanoseconds spent in each phase
+
+        self.counts: dictionary of the number of times each phase ran
+
+        self.maximums: dictionary of the longest time in nanoseconds each phase took
+
+        self.histograms: dictionary of (num_buckets) size lists counting the durations of each phase
+        """
+        self.enabled = enabled
+        self.totals = dict.fromkeys(phases, 0)
+        self.counts = dict.fromkeys(phases, 0)
+        self.maximums = dict.fromkeys(phases, 0)
+        self.histograms = {phase: [0] * self.num_buckets for phase in phases}
+
+    def time(self, phase, function, *args):
+        """
+        Calls function with args, adding the time it took to phase.
+
+        Returns
+        -------
+        whatever function returns
+        """
+        if not self.enabled:
+            return function(*args)
+
+        start = perf_counter_ns()
+        result = function(*args)
+        elapsed = perf_counter_ns() - start
+        self.totals[phase] += elapsed
+        self.counts[phase] += 1
+        if elapsed > self.maximums[phase]:
+            self.maximums[phase] = elapsed
+        self.histograms[phase][min((elapsed // 1000).bit_length(), self.num_buckets - 1)] += 1
+        return result
+
+    def report(self):
+        """
+        Returns
+        -------
+        str containing a table of the calls, total, mean, and maximum time and share of the total of each phase,
+            followed by the histogram of each phase
+        """
+        total_time = sum(self.totals.values())
+        lines = ["{:<24} {:>8} {:>12} {:>12} {:>12} {:>7}".format("Phase", "Calls", "Total (s)", "Mean (ms)",
+                                                                   "Max (ms)", "Share")]
+        for phase in self.totals:
+            calls = self.counts[phase]
+            lines.append("{:<24} {:>8} {:>12.6f} {:>12.6f} {:>12.6f} {:>6.1f}%".format(
+                phase, calls, self.totals[phase] / 1e9, self.totals[phase] / calls / 1e6 if calls else 0,
+                self.maximums[phase] / 1e6, 100 * self.totals[phase] / total_time if total_time else 0
+            ))
+
+        lines.append("Durations in microseconds:")
+        for phase, histogram in self.histograms.items():
+            buckets = ["<" + str(2 ** bucket) + ": " + str(count) for bucket, count in enumerate(histogram) if count]
+            lines.append("{:<24} {}".format(phase, ", ".join(buckets)))
+        return "\n".join(lines)
@@ -0,0 +1,99 @@
+# Author: Julian Pryde
+import argparse
+import os
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib import pyplot, animation
+from plot_particles import PlotParticles
+from trajectory import read_trajectory
+
+
+class TrajectoryRenderer:
+    """
+    Draws the snapshots in a trajectory file recorded by trajectory.TrajectoryRecorder, after the run and without a
+    display, either as one image per snapshot or as a single animation.  2 dimensional problems are drawn over the same
+    contour overlay as PlotParticles, which is computed once for the whole trajectory.
+    """
+
+    def __init__(self, file_name):
+        """
+        self.header: dictionary describing the run, from read_trajectory
+
+        self.snapshots: structured np.ndarray of snapshots, from read_trajectory
+
+        self.limits: (num_dimensions, 2) size list containing the lower and upper limit of each dimension
+        """
+        self.header, self.snapshots = read_trajectory(file_name)
+        self.limits = self.header["limits"]
+        if len(self.limits) not in (2, 3):
+            raise ValueError("Cannot display graph of " + str(len(self.limits)) + " dimensions")
+        if len(self.snapshots) == 0:
+            raise ValueError(file_name + " does not contain any snapshots.")
+
+        self.figure = pyplot.figure()
+        if len(self.limits) == 3:
+            self.axes = self.figure.add_subplot(projection='3d')
+        else:
+            self.axes = self.figure.add_subplot()
+            x, y, z, levels = PlotParticles(self.limits, []).create_contour_overlay()
+            contour_plot = self.axes.contour(x, y, z, levels)
+            self.axes.clabel(contour_plot, inline=True, fontsize=10)
+        self.axes.set_xlim(self.limits[0])
+        self.axes.set_ylim(self.limits[1])
+        if len(self.limits) == 3:
+            self.axes.set_zlim(self.limits[2])
+        self.particles_plot = None
+        self.best_particle_plot = None
+
+    def draw_snapshot(self, index):
+        """
+        Replaces the particles drawn on the figure with those of snapshot index.
+
+        Returns
+        -------
+        list of the matplotlib artists which were changed
+        """
+        snapshot = self.snapshots[index]
+        if self.particles_plot is not None:
+            self.particles_plot.remove()
+            self.best_particle_plot.remove()
+        self.particles_plot = self.axes.scatter(*snapshot["positions"].T, c='black', s=8)
+        self.best_particle_plot = self.axes.scatter(*snapshot["best_position"][:, None], c='red', marker='x')
+        self.axes.set_title("Iteration " + str(snapshot["iteration"]))
+        return [self.particles_plot, self.best_particle_plot]
+
+    def save_frames(self, directory, image_format="png"):
+        os.makedirs(directory, exist_ok=True)
+        for index in range(len(self.snapshots)):
+            self.draw_snapshot(index)
+            self.figure.savefig(os.path.join(directory, "frame_{:06d}.{}".format(index, image_format)))
+
+    def save_animation(self, file_name, fps=10):
+        """
+        Saves every snapshot as one animation.  .gif files are written with Pillow, other formats such as .mp4 need
+        ffmpeg to be installed.
+        """
+        writer = animation.PillowWriter(fps=fps) if file_name.endswith(".gif") else animation.FFMpegWriter(fps=fps)
+        trajectory_animation = animation.FuncAnimation(self.figure, self.draw_snapshot, frames=len(self.snapshots))
+        trajectory_animation.save(file_name, writer=writer)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render a trajectory file recorded with the trajectory_file argument")
+    parser.add_argument("trajectory_file")
+    parser.add_argument("--frames", metavar="DIRECTORY", default=None, help="Save one image per snapshot")
+    parser.add_argument("--animation", metavar="FILE", default=None,
+                        help="Save an animation of all snapshots, such as trajectory.gif or trajectory.mp4")
+    parser.add_argument("--fps", type=int, default=10, help="Frames per second of the animation")
+    command_line_arguments = parser.parse_args()
+    if command_line_arguments.frames is None and command_line_arguments.animation is None:
+        parser.error("Give --frames, --animation, or both.")
+
+    renderer = TrajectoryRenderer(command_line_arguments.trajectory_file)
+    print("Rendering " + str(len(renderer.snapshots)) + " snapshots of " +
+          str(renderer.header["num_recorded_particles"]) + " of " + str(renderer.header["num_particles"]) +
+          " particles")
+    if command_line_arguments.frames is not None:
+        renderer.save_frames(command_line_arguments.frames)
+    if command_line_arguments.animation is not None:
+        renderer.save_animation(command_line_arguments.animation, command_line_arguments.fps)
@@ -0,0 +1,148 @@
+import argparse
+import asyncio
+import json
+import threading
+from forcing_function import forcing_function
+
+
+class SimulationClient:
+    """
+    Async forcing function which scores a particle by sending its raw position to a simulation service and waiting for
+    the reply.  Requests and replies are single lines of JSON: {"position": [...]} and {"score": ...}.  Each call opens
+    its own connection so any number of calls can be in flight at once.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+
+    @classmethod
+    def from_address(cls, address):
+        """
+        Parameters
+        ----------
+        address: str in the form "host:port"
+        """
+        host, port = address.rsplit(":", 1)
+        return cls(host, int(port))
+
+    async def __call__(self, raw_position):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write((json.dumps({"position": [float(value) for value in raw_position]}) + "\n").encode())
+            await writer.drain()
+            reply = await reader.readline()
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+        if not reply:
+            raise ConnectionResetError("Simulation service closed the connection without replying.")
+
+        return json.loads(reply)["score"]
+
+
+def create_objective(swarm_arguments):
+    """
+    Returns
+    -------
+    SimulationClient for the simulation_server in swarm_arguments if there is one, otherwise the forcing function
+    """
+    if 'simulation_server' in swarm_arguments:
+        return SimulationClient.from_address(swarm_arguments['simulation_server'])
+
+    return forcing_function
+
+
+class SimulationServer:
+    """
+    Local stand-in for a simulation service, for exercising the "async" evaluation executor without the real service.
+    Scores requests from SimulationClient with the forcing function after waiting latency seconds to imitate a round
+    trip.  Can be run in the foreground from the command line or in a background thread with start() and stop().
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, objective=forcing_function):
+        """
+        self.host, self.port: address to listen on.  Port 0 picks a free port, which is stored in self.port on start
+
+        self.latency: seconds to wait before replying to each request
+
+        self.objective: forcing function used to score requests
+
+        self.requests_served: int containing the number of requests replied to
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.objective = objective
+        self.requests_served = 0
+        self.event_loop = None
+        self.server = None
+        self.thread = None
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while request := await reader.readline():
+                raw_position = json.loads(request)["position"]
+                await asyncio.sleep(self.latency)
+                score = float(self.objective(raw_position))
+                writer.write((json.dumps({"score": score}) + "\n").encode())
+                await writer.drain()
+                self.requests_served += 1
+        except (asyncio.CancelledError, ConnectionError):
+            # Either the server is stopping or the client gave up on the request
+            pass
+        finally:
+            writer.close()
+
+    async def open(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def start(self):
+        """
+        Starts serving in a background thread.
+
+        Returns
+        -------
+        int containing the port being listened on
+        """
+        self.event_loop = asyncio.new_event_loop()
+        self.event_loop.run_until_complete(self.open())
+        self.thread = threading.Thread(target=self.event_loop.run_forever, daemon=True)
+        self.thread.start()
+        return self.port
+
+    async def close(self):
+        self.server.close()
+        connections = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for connection in connections:
+            connection.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
+        await self.server.wait_closed()
+
+    def stop(self):
+        """
+        Stops a server started with start(), dropping any requests still being handled.
+        """
+        asyncio.run_coroutine_threadsafe(self.close(), self.event_loop).result()
+        self.event_loop.call_soon_threadsafe(self.event_loop.stop)
+        self.thread.join()
+        self.event_loop.close()
+
+    async def serve_forever(self):
+        await self.open()
+        print("Simulation server listening on " + self.host + ":" + str(self.port))
+        async with self.server:
+            await self.server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for a simulation service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before replying to each request")
+    command_line_arguments = parser.parse_args()
+    asyncio.run(SimulationServer(command_line_arguments.host,
+                                 command_line_arguments.port,
+                                 command_line_arguments.latency).serve_forever())
@@ -1,11 +1,15 @@
 from particle import Particle, SpeedToHighError
+from swarm_state import SwarmState
+from evaluation import ForcingFunctionEvaluator, evaluation_argument_keys
+from forcing_function import forcing_function
+from neighbor_search import VerletNeighborSearch, find_connected_components
+from fit_plane import fit_planes
 from input_handling import ArgumentException
-import plot_particles
-from math_functions import find_hypotenuse
+from math_functions import find_hypotenuse, find_hypotenuses
+import kernels
 import numpy as np
 import functools
 from typing import Sized
-import networkx as nx
 
 
 class ParticleListError(Exception):
@@ -14,7 +18,10 @@ class ParticleListError(Exception):
 
 class ParticleList(Sized):
     """
-    All variables and methods necessary for an arbitrary group of particles
+    All variables and methods necessary for an arbitrary group of particles.  A ParticleList is an array of particle ids
+    into one swarm's SwarmState, and Particle views are only created when a particle is asked for, so taking subsets
+    never copies particles.  Membership is tested with a boolean mask over the whole swarm, so set operations are
+    linear in the sizes of the lists.
     """
 
     def __init__(self, **kwargs):
@@ -22,76 +29,136 @@ class ParticleList(Sized):
 
         Parameters
         ----------
-        kwargs: Dict of either a python list of particles such as {"particles": [particle_1, ...]} or arguments to
-            instantiate a new set of particles, such as {"limits": [[0, 10], [-4, 0]], "num_particles": 50}
+        kwargs: Dict of either a python list of particles such as {"particles": [particle_1, ...]}, a list of particle
+            ids and the swarm they belong to such as {"particles": [0, 4, ...], "particle_swarm": swarm}, an array of
+            particle ids and the SwarmState they index such as {"ids": ids, "state": state}, or arguments to instantiate
+            a new set of particles, such as {"limits": [[0, 10], [-4, 0]], "num_particles": 50, "seed": 1,
+            "dtype": "float32", "storage_directory": "/scratch/swarm", "chunk_size": 65536}
+
+        self.state: SwarmState the particles are stored in, None only for an empty list of particles
+
+        self.ids: (num_particles in list) size array of np.intp containing the id of each particle, in list order
+
+        self.mask: (num_particles in self.state) size array of bools, True for the particles in the list.  Built the
+            first time membership is tested and dropped whenever self.ids changes
         """
-        if "particles" in kwargs:
-            if not kwargs["particles"]:
-                self.particles = []
-            elif isinstance(kwargs["particles"][0], (int, np.int32, np.int64)):
-                self.particles = kwargs["particle_swarm"][kwargs["particles"]]
+        if "ids" in kwargs:
+            state, ids = kwargs["state"], kwargs["ids"]
+        elif "particles" in kwargs:
+            particles = kwargs["particles"]
+            if "particle_swarm" in kwargs:
+                state, ids = kwargs["particle_swarm"].state, particles
+            elif isinstance(particles, ParticleList):
+                state, ids = particles.state, particles.ids
             else:
-                self.particles = kwargs["particles"]
+                state = particles[0].state if len(particles) else kwargs.get("state")
+                ids = [particle.id for particle in particles]
         else:
-            self.particles = [Particle(kwargs["limits"], i) for i in range(kwargs["num_particles"])]
+            state = SwarmState(kwargs["limits"], kwargs["num_particles"], kwargs.get("seed"),
+                               kwargs.get("dtype", np.double), kwargs.get("storage_directory"),
+                               kwargs.get("chunk_size"))
+            ids = np.arange(kwargs["num_particles"])
 
-    def __len__(self) -> int:
-        return len(self.particles)
+        self.state = state
+        self.ids = None
+        self.mask = None
+        self.set_ids(ids)
 
-    def __iter__(self):
-        return iter(self.particles)
+    def set_ids(self, ids):
+        self.ids = np.asarray(ids, dtype=np.intp).reshape(-1)
+        self.mask = None
 
-    def build_particle_list(self, expression):
+    def create_subset(self, ids):
         """
-        Creates a list out of a subset of its own particle list according to an expression.
+        Returns
+        -------
+        ParticleList of the particles with ids, sharing this list's storage
+        """
+        return ParticleList(state=self.state, ids=ids)
 
-        Parameters
-        ----------
-        expression: function which evaluates to True for all particles to be in the returned list
+    def get_mask(self):
+        """
+        Returns
+        -------
+        (num_particles in swarm) size array of bools, True for the particles in this list
+        """
+        if self.mask is None:
+            self.mask = np.zeros(0 if self.state is None else self.state.num_particles, dtype=np.bool_)
+            self.mask[self.ids] = True
+        return self.mask
+
+    def __len__(self) -> int:
+        return len(self.ids)
 
+    def __iter__(self):
+        return (Particle(self.state, particle_id) for particle_id in self.ids.tolist())
+
+    def __contains__(self, particle):
+        particle_id = particle.id if isinstance(particle, Particle) else particle
+        mask = self.get_mask()
+        return 0 <= particle_id < len(mask) and bool(mask[particle_id])
+
+    def find_ids(self, other):
+        """
+        Returns
+        -------
+        array of np.intp containing the ids of the particles in other, which may be a Particle, a ParticleList, or an
+            iterable of Particles or of particle ids
+        """
+        if isinstance(other, ParticleList):
+            return other.ids
+        if isinstance(other, Particle):
+            return np.array([other.id], dtype=np.intp)
+        if isinstance(other, np.ndarray) and other.dtype != object:
+            return other.astype(np.intp).reshape(-1)
+        return np.array([item.id if isinstance(item, Particle) else item for item in other], dtype=np.intp)
+
+    def find_mask(self, other):
+        """
         Returns
         -------
-        python list of particles according to the expression
+        (num_particles in swarm) size array of bools, True for the particles in other, see find_ids
         """
-        result = [particle for particle_index, particle in enumerate(self.particles) if expression(particle)]
-        return result
+        if isinstance(other, ParticleList):
+            return other.get_mask()
+        mask = np.zeros(len(self.get_mask()), dtype=np.bool_)
+        mask[self.find_ids(other)] = True
+        return mask
 
     def __getitem__(self, index):
         """
         Get a particle or group of particles in a ParticleList instance or a single particle.
-        Groups can be selected using an array of booleans or an array of integers
+        Groups can be selected using an array of booleans, True for each particle id to select, or an array of particle
+        ids, which selects the particles of this list with those ids in list order.
         Parameters
         ----------
-        index: List or array of booleans or integers or scalar integer
+        index: List or array of booleans or integers or scalar integer position in the list
 
         Returns
         -------
         ParticleList of particles if selecting multiple particles or single particle.
         """
         if isinstance(index, (list, np.ndarray)):
-            if isinstance(index[0], (bool, np.bool_)):
-                return ParticleList(particles=self.build_particle_list(lambda particle: index[particle.id]))
+            index = np.asarray(index)
+            if index.dtype == np.bool_:
+                return self.create_subset(self.ids[index[self.ids]])
+
+            if np.issubdtype(index.dtype, np.integer) or len(index) == 0:
+                return self.intersection(index)
 
-            if isinstance(index[0], (int, np.int_, np.int32, np.int64)):
-                return ParticleList(particles=self.build_particle_list(lambda particle: index == particle.id))
+        elif isinstance(index, slice):
+            return self.create_subset(self.ids[index])
 
-        elif isinstance(index, (int, np.int_, np.int32, np.int64)):
-            return self.particles[index]
+        elif isinstance(index, (int, np.integer)):
+            return Particle(self.state, int(self.ids[index]))
 
     def __add__(self, other):
-        if not self.particles:
-            output = ParticleList(particles=[other])
-        elif isinstance(other, ParticleList):
-            output = ParticleList(particles=(self.particles + other.particles))
-        elif isinstance(other, list):
-            combined_particles = self.particles + other
-            output = ParticleList(particles=combined_particles)
-        elif isinstance(other, Particle):
-            combined_particles = self.particles + [other]
-            output = ParticleList(particles=combined_particles)
-        elif isinstance(other, np.ndarray):
-            combined_particles = self.particles + list(other)
-            output = ParticleList(particles=combined_particles)
+        if isinstance(other, (ParticleList, Particle, list, np.ndarray)):
+            state = self.state
+            if state is None:
+                state = other.state if isinstance(other, (ParticleList, Particle)) else \
+                    next((item.state for item in other if isinstance(item, Particle)), None)
+            output = ParticleList(state=state, ids=np.concatenate((self.ids, self.find_ids(other))))
         else:
             raise ParticleListError("Invalid operand type: " + str(type(other)))
         return output
@@ -100,23 +167,21 @@ class ParticleList(Sized):
         return self.__add__(other)
 
     def intersection(self, other):
-        def id_intersection(particle):
-            if isinstance(other, ParticleList):
-                return True if particle.id in other.get_ids() else False
-            else:
-                return True if particle.id in other else False
-
-        return ParticleList(particles=self.build_particle_list(id_intersection))
+        """
+        Returns
+        -------
+        ParticleList of the particles of this list which are also in other, in this list's order
+        """
+        return self.create_subset(self.ids[self.find_mask(other)[self.ids]])
 
     def get_ids(self):
-        ids = [particle.id for particle in self.particles]
-        return ids
+        return self.ids
 
     def get_scores(self):
-        return np.array([particle.score for particle in self.particles])
+        return self.state.scores[self.ids]
 
     def get_velocities(self):
-        return np.array([particle.velocity for particle in self.particles])
+        return self.state.velocities[self.ids]
 
     def remove(self, particles_to_remove):
         """
@@ -125,18 +190,11 @@ class ParticleList(Sized):
         ----------
         particles_to_remove: Either a single particle or a ParticleList object
         """
-        if isinstance(particles_to_remove, ParticleList):
-            particle_ids = [particle.id for particle in particles_to_remove]
-        else:
-            particle_ids = particles_to_remove.id
-
-        new_particles = self.build_particle_list(lambda particle: particle.id not in particle_ids)
-
-        self.particles = new_particles
+        self.set_ids(self.ids[~self.find_mask(particles_to_remove)[self.ids]])
 
     def pop(self):
         popped_particle = self[0]
-        self.particles = self.particles[1:]
+        self.set_ids(self.ids[1:])
         return popped_particle
 
     def get_best(self, optimization_function):
@@ -169,17 +227,14 @@ class ParticleList(Sized):
 
         Returns
         -------
-        np.ndarray of output from function calls on all particles.  If the function returns more than one variable,
-            return array is 2-D, with each column containing one returned variables for each particle and each row
-            containing all returned values for each particle.
+        list of the output of the function call on each particle, or None for an empty ParticleList
 
         Example
         -------
-        args = (self.velocity_coefficient, optimization_function, least_squares_method)
+        Shake every particle by the swarm's sigma:
 
-        outputs = self.iterate_particles(
-            lambda inner_args, particle: particle.update_velocity_with_gradient(*inner_args), *args
-        )
+        particle_swarm.iterate_particles(lambda inner_args, particle: particle.shake(*inner_args), None,
+                                         particle_swarm.sigma)
 
         """
         full_function = functools.partial(function, args)
@@ -192,38 +247,34 @@ class ParticleList(Sized):
             pass
         return output_list
 
-    def get_particles_by_id_looper(self, iteration, particle_ids, particle_list):
-        if self[iteration].id in particle_ids:
-            particle_list += self[iteration]
-            particle_ids.remove(self[iteration].id)
-            if not particle_ids:
-                return particle_list
-            else:
-                iteration += 1
-                particle_list = self.get_particles_by_id_looper(iteration, particle_ids, particle_list)
-        elif iteration == len(self) - 1:
-            raise ParticleListError("No particle in this list with id of " + particle_ids)
-        else:
-            iteration += 1
-            particle_list = self.get_particles_by_id_looper(iteration, particle_ids, particle_list)
-
-        return particle_list
-
     def get_particles_by_id(self, particle_ids):
-        output = self.get_particles_by_id_looper(0, particle_ids, ParticleList(particles=[]))
-        return output
+        """
+        Returns
+        -------
+        ParticleList of the particles with particle_ids, in the order of particle_ids
+        """
+        particle_ids = self.find_ids(particle_ids)
+        missing_ids = particle_ids[~self.get_mask()[particle_ids]]
+        if len(missing_ids):
+            raise ParticleListError("No particle in this list with id of " + str(missing_ids.tolist()))
+        return self.create_subset(particle_ids)
 
     def remove_duplicates(self):
-        all_particle_ids = np.array(self.get_ids())
-        unique_particle_ids = list(np.unique(all_particle_ids))
-        output_particle_list = self.get_particles_by_id(unique_particle_ids)
-        self.particles = output_particle_list.particles
+        """
+        Keeps only the first of each particle in the list, sorted by id
+        """
+        self.set_ids(np.unique(self.ids))
 
 
 class Swarm(ParticleList):
-    def __init__(self, swarm_arguments):
+    def __init__(self, swarm_arguments, objective=forcing_function):
         self.limits = swarm_arguments['limits']
-        super().__init__(limits=self.limits, num_particles=swarm_arguments["num_particles"])
+        super().__init__(limits=self.limits,
+                         num_particles=swarm_arguments["num_particles"],
+                         seed=swarm_arguments['seed'] if 'seed' in swarm_arguments else None,
+                         dtype=swarm_arguments['dtype'] if 'dtype' in swarm_arguments else np.double,
+                         storage_directory=swarm_arguments.get('storage_directory'),
+                         chunk_size=swarm_arguments.get('chunk_size'))
         self.initial_local_radius_limit = swarm_arguments['local_radius_limit']
         self.local_radius_limit = self.initial_local_radius_limit
         self.min_local_radius_limit = np.double(0.01)
@@ -231,8 +282,9 @@ class Swarm(ParticleList):
         self.fastest_particle = self[0]
         self.best_particle = self[0]
         self.previous_best_particle = None
-        self.list_of_groups = None
-        self.r_squareds = np.zeros(len(self.particles))
+        self.group_labels = None
+        self.neighbor_list = None
+        self.r_squareds = self.state.create_array(len(self))
         self.velocity_coefficient = swarm_arguments['velocity_coefficient']
         self.high_particle_velocity_counter = 0
         if 'sigma' in swarm_arguments:
@@ -247,6 +299,12 @@ class Swarm(ParticleList):
         else:
             self.annealing_lifetime = 100
 
+        neighbor_skin = swarm_arguments['neighbor_skin'] if 'neighbor_skin' in swarm_arguments else 0.25
+        self.neighbor_search = VerletNeighborSearch(neighbor_skin, self.state.chunk_size, self.state.storage_directory)
+
+        evaluation_arguments = {key: swarm_arguments[key] for key in evaluation_argument_keys if key in swarm_arguments}
+        self.evaluator = ForcingFunctionEvaluator(objective, **evaluation_arguments)
+
     def simulate_annealing(self, iteration):
         if iteration < self.annealing_lifetime:
             self.sigma = self.initial_sigma * (1 - (iteration / self.annealing_lifetime))
@@ -264,136 +322,143 @@ class Swarm(ParticleList):
                                    self.annealing_lifetime
 
     def call_forcing_function(self):
-        self.iterate_particles(lambda inner_args, particle: particle.execute_forcing_function())
+        for particles in self.state.find_chunks():
+            self.state.scores[particles] = self.evaluator.evaluate(self.state.calculate_raw_positions(particles))
 
     def find_local_groups(self):
-        find_local_groups_success = np.bool_([False])
-        while not all(find_local_groups_success):
-            find_local_groups_success = self.iterate_particles(
-                lambda args, particle: particle.find_particles_in_local_radius(self),
-                np.ndarray,
-                ())
-
-            if not all(find_local_groups_success):
-                self.raise_local_radius_limit()
-
-    def update_velocities_with_best_neighbor(self):
-        args = self.velocity_coefficient
-        velocity_coefficient_too_high = any(
-            self.iterate_particles(
-                lambda inner_args, particle: particle.update_velocity_with_best_neighbor(*inner_args), np.ndarray, *args
-            )
-        )
+        """
+        Finds the particles within the local radius of every particle with one batched neighbor search, raising the
+        local radius limit until every particle has at least 3 particles within its local radius.  Neighbor lists are
+        reused across iterations and radius increases for as long as the neighbor search's skin allows.
+        """
+        self.neighbor_list = self.neighbor_search.query(self.state.positions, self.local_radius_limit)
+        while self.neighbor_list.find_count_range(self.state.chunk_size)[0] < 3:
+            self.raise_local_radius_limit()
+            self.neighbor_list = self.neighbor_search.query(self.state.positions, self.local_radius_limit)
+
+    def get_scores(self):
+        return self.state.scores
+
+    def get_velocities(self):
+        return self.state.velocities
+
+    def calculate_raw_positions(self):
+        return self.state.calculate_raw_positions()
+
+    def update_velocities_with_best_neighbor(self, optimization_function):
+        """
+        Points every particle at the best scoring particle within its local radius, found from self.neighbor_list, with
+        a speed of the difference in their scores times the velocity coefficient.  Particles which are the best of their
+        own neighborhood, or share their best neighbor's position, stop.
+
+        Returns
+        -------
+        bool, True if any velocity component is larger than 1
+        """
+        velocity_coefficient_too_high = False
+        for particles in self.state.find_chunks():
+            block_indptr = self.neighbor_list.indptr[particles.start:particles.stop + 1] - \
+                self.neighbor_list.indptr[particles.start]
+            neighbor_ids = self.neighbor_list.get_neighbors(particles.start, particles.stop)
+            best_neighbor_ids = kernels.find_best_neighbors(self.state.scores, block_indptr, neighbor_ids,
+                                                            optimization_function == "max")
+            directions = self.state.positions[best_neighbor_ids] - self.state.positions[particles]
+            distances = find_hypotenuses(directions)
+            score_differences = np.abs(self.state.scores[best_neighbor_ids] - self.state.scores[particles])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                speeds = np.where(distances > 0, score_differences * self.velocity_coefficient / distances, 0)
+            velocities = self.state.velocities[particles]
+            np.multiply(directions, speeds[:, np.newaxis], out=velocities)
+            velocity_coefficient_too_high |= bool(np.any(velocities > 1))
         return velocity_coefficient_too_high
 
     def update_velocities_with_gradient(self, least_squares_method, optimization_function):
-        args = (self.velocity_coefficient, optimization_function, least_squares_method)
-
-        outputs = self.iterate_particles(
-            lambda inner_args, particle: particle.update_velocity_with_gradient(*inner_args), list, *args
-        )
-        self.r_squareds = np.array([output_tuple[1] for output_tuple in outputs])
-        velocity_coefficient_too_high = any([output_tuple[0] for output_tuple in outputs])
+        # The gradients are written straight into the velocities, then scaled a chunk at a time
+        fit_planes(self.state.positions, self.state.scores, self.neighbor_list, least_squares_method,
+                   gradients=self.state.velocities, r_squareds=self.r_squareds)
+        velocity_scale = -self.velocity_coefficient if optimization_function == "min" else self.velocity_coefficient
+        velocity_coefficient_too_high = False
+        for particles in self.state.find_chunks():
+            velocities = self.state.velocities[particles]
+            velocities *= velocity_scale
+            velocity_coefficient_too_high |= bool(np.any(velocities > 1))
         return velocity_coefficient_too_high
 
     def update_swarm_velocities(self, optimization_function, least_squares_method):
-        if self.velocity_update_method == "best neighbor":
-            velocity_coefficient_too_high = self.update_velocities_with_best_neighbor()
+        if self.velocity_update_method == "best_neighbor":
+            velocity_coefficient_too_high = self.update_velocities_with_best_neighbor(optimization_function)
         elif self.velocity_update_method == "gradient":
             velocity_coefficient_too_high = self.update_velocities_with_gradient(least_squares_method,
                                                                                  optimization_function)
         else:
             raise ArgumentException("Velocity update method: \"" + self.velocity_update_method + "\" not implemented.")
 
+        # Reductions show up in the velocity_coefficient telemetry field
         if velocity_coefficient_too_high:
             self.velocity_coefficient -= 0.001
-            print("Velocity coefficient too high. Particles moving too fast to control. Reducing velocity"
-                  " coefficient by 0.001 to: " + str(self.velocity_coefficient) + ".\n")
 
         return np.mean(self.r_squareds)
 
     def move_particles(self):
-        for particle in self.particles:
-            particle.move()
+        for particles in self.state.find_chunks():
+            kernels.move_particles(self.state.positions[particles], self.state.velocities[particles])
 
     def add_randomness_factor(self):
-        for particle in self.particles:
-            particle.shake(self.sigma)
+        if self.sigma > 0:
+            for particles in self.state.find_chunks():
+                # Drawn in the swarm's dtype, which for np.double gives the same numbers as rng.normal(0, self.sigma).
+                # Drawing a chunk at a time gives the same numbers as drawing for the whole swarm at once
+                randomness = self.state.rng.standard_normal(self.state.positions[particles].shape,
+                                                            dtype=self.state.dtype)
+                randomness *= self.sigma
+                self.state.positions[particles] += randomness
 
     def find_fastest_particle(self):
-        particle_movements = np.array(list(map(find_hypotenuse, self.get_velocities())))
-        self.fastest_particle = self[np.argmax(particle_movements)]
-        particle_movements_over_limit = particle_movements > find_hypotenuse(np.ones(len(self.limits)))
+        speed_limit = find_hypotenuse(np.ones(len(self.limits)))
+        fastest_particle_id, fastest_movement, fastest_movement_over_limit = 0, -np.inf, 0
+        for particles in self.state.find_chunks():
+            particle_movements = find_hypotenuses(self.state.velocities[particles])
+            particle_movements_over_limit = particle_movements > speed_limit
+            allowed_movements = np.where(particle_movements_over_limit, 0, particle_movements)
+            chunk_fastest_id = np.argmax(allowed_movements)
+            # Strictly faster, so ties keep the lowest id the same as an argmax over the whole swarm
+            if allowed_movements[chunk_fastest_id] > fastest_movement:
+                fastest_particle_id = particles.start + chunk_fastest_id
+                fastest_movement = allowed_movements[chunk_fastest_id]
+            if np.any(particle_movements_over_limit):
+                fastest_movement_over_limit = max(fastest_movement_over_limit, particle_movements.max())
+                self.state.velocities[particles][particle_movements_over_limit] = 0
+        self.fastest_particle = self[fastest_particle_id]
 
         try:
-            if any(particle_movements_over_limit):
-                raise SpeedToHighError(particle_movements)
-        except SpeedToHighError as error:
-            self[particle_movements_over_limit].velocity = np.zeros(len(self.limits))
+            if fastest_movement_over_limit > 0:
+                raise SpeedToHighError(fastest_movement_over_limit)
+        except SpeedToHighError:
+            # Reported through the high_particle_velocity_counter and velocity_coefficient telemetry fields
             self.velocity_coefficient -= 0.001
             self.high_particle_velocity_counter += 1
-            print("Particle(s)" + str(np.where(particle_movements_over_limit)) + " velocity too high at " +
-                  str(error.speed) + ". Reducing particle velocity to 0, lowering velocity coefficient by 0.001 to: " +
-                  str(self.velocity_coefficient) + ". This is occurence number: " +
-                  str(self.high_particle_velocity_counter))
 
     def find_best_particle(self, function):
         self.previous_best_particle = self.best_particle
         self.best_particle = self.get_best(function)
-        return True if self.best_particle is self.previous_best_particle else False
-
-    def print_summary(self, iteration):
-        output_string = \
-            "Iteration: " + str(iteration) + "\n" + \
-            "sigma: " + str(self.sigma) + "\n" + \
-            "initial sigma: " + str(self.initial_sigma) + "\n" + \
-            "Most movement: " + str(find_hypotenuse(self.fastest_particle.velocity)) + "\n" + \
-            "Best Particle Score: " + str(self.best_particle.score) + "\n" + \
-            "Scores: " + str(self.get_scores()) + "\n" + \
-            "Best particle position: " + str(self.best_particle.calculate_raw_position()) + "\n" + \
-            "Best particle ID: " + str(self.best_particle.id) + "\n" + \
-            "Best particle velocity: " + str(self.best_particle.velocity) + "\n"
-            # "Velocities: " + str(self.get_velocities())
-        if self.velocity_update_method == "gradient":
-            output_string += "Average R2: " + str(self.r_squareds.mean()) + "\n"
-        print(output_string)
-
-    def find_groups_graphs(self):
+        return True if self.best_particle.id == self.previous_best_particle.id else False
+
+    def find_groups(self):
         """
-        Finds groups of particles within each others' local radius by the following algorithm:
-        - Create adjacency matrix between all particles where edge weight is particle distance
-        - If edge weight is > local radius limit, set edge weight to zero
-        - Create a graph where:
-            a. each node is a particle
-            b. edges between particles exist if the distance between the two particles < local radius limit
-        - Determine the connected groups of the graph
+        Finds groups of particles, where every particle is within the local radius limit of at least one other particle
+        in its group, from the neighbor list rather than a matrix of the distances between all particles.
+
+        Returns
+        -------
+        (num_particles) size array of np.intp containing the group of each particle
         """
-        particle_adjacency = np.zeros((len(self.particles), len(self.particles)))
-        for i, from_particle in enumerate(self):
-            particle_adjacency[i, :] = np.array([
-                from_particle.find_distance_to_particle(to_particle) for to_particle in self
-            ])
-        particle_adjacency = particle_adjacency < self.local_radius_limit
-        particle_graph = nx.from_numpy_array(particle_adjacency)
-        list_of_groups = nx.connected_components(particle_graph)
-        print("List of groups: " + str(list(list_of_groups)))
-
-    def find_groups_recursive(self):
-        not_yet_assigned = ParticleList(particles=self.particles)
-        list_of_groups = []
-        while len(not_yet_assigned) > 1:
-            base_particle = not_yet_assigned.pop()
-            local_group = ParticleList(particles=[base_particle])
-            local_group, not_yet_assigned = \
-                base_particle.iterate_neighbors_to_find_local_groups(not_yet_assigned, local_group)
-            list_of_groups.append(local_group)
-
-        if len(not_yet_assigned) == 1:
-            list_of_groups.append(not_yet_assigned)
-
-        print("Number of groups: " + str(len(list_of_groups)))
-        self.list_of_groups = list_of_groups
+        neighbor_list = self.neighbor_search.query(self.state.positions, self.local_radius_limit)
+        self.group_labels = find_connected_components(neighbor_list, self.state.chunk_size,
+                                                      self.state.storage_directory)
+        return self.group_labels
 
     def plot_particle_positions(self):
-        plot = plot_particles.PlotParticles(self.limits, self.particles)
+        # Imported here since matplotlib takes longer to import than most runs take to finish
+        import plot_particles
+        plot = plot_particles.PlotParticles(self.limits, self)
         plot.plot_particle_positions(plot_contour_overlay=True)
@@ -0,0 +1,94 @@
+import os
+import numpy as np
+import math_functions
+from array_storage import create_array, find_chunks, default_chunk_size
+
+
+class SwarmState:
+    """
+    Contiguous storage for every per-particle value in a swarm.  Particle objects are views into one row of these
+    arrays, so whole-swarm operations can be done with numpy instead of looping over particles in python.
+
+    With a storage directory the arrays are memory-mapped from files on disk instead of held in memory, so swarms larger
+    than memory can be run.  Every phase of an iteration then works through the swarm a chunk of chunk_size particles
+    at a time, so only about one chunk of each array needs to be in memory at once.
+    """
+
+    def __init__(self, limits, num_particles, seed=None, dtype=np.double, storage_directory=None, chunk_size=None):
+        """
+        self.num_particles: int containing the number of particles stored
+
+        self.dtype: np.dtype of the positions, velocities, and scores, either np.double or np.single.  np.single halves
+            the memory and bandwidth used by large swarms at the cost of precision
+
+        self.num_dimensions: int containing the number of dimensions of the problem
+
+        self.normalization_m, self.normalization_b: (num_dimensions) size arrays used to convert normalized positions
+            to raw positions.  Shared by all particles
+
+        self.positions: (num_particles, num_dimensions) size array of self.dtype containing the normalized position of
+            each particle
+
+        self.velocities: (num_particles, num_dimensions) size array of self.dtype containing the velocity of each
+            particle
+
+        self.scores: (num_particles) size array of self.dtype containing the forcing function score of each particle
+
+        self.rng: np.random.Generator used for all randomness in the swarm, seeded with seed so that runs can be
+            repeated and resumed
+
+        self.storage_directory: str containing the directory the arrays are memory-mapped from, or None to hold them in
+            memory
+
+        self.chunk_size: int containing the most particles processed at once.  Defaults to the whole swarm in memory and
+            to array_storage.default_chunk_size with a storage directory
+        """
+        self.num_particles = num_particles
+        self.dtype = np.dtype(dtype)
+        self.num_dimensions = len(limits)
+        self.normalization_m, self.normalization_b = math_functions.compute_normalization_factors(limits)
+        self.rng = np.random.default_rng(seed)
+        self.storage_directory = storage_directory
+        if chunk_size is not None:
+            self.chunk_size = int(chunk_size)
+        elif storage_directory is not None:
+            self.chunk_size = default_chunk_size
+        else:
+            self.chunk_size = max(1, num_particles)
+
+        if storage_directory is not None:
+            os.makedirs(storage_directory, exist_ok=True)
+        self.positions = self.create_array((self.num_particles, self.num_dimensions))
+        self.velocities = self.create_array((self.num_particles, self.num_dimensions))
+        self.scores = self.create_array(self.num_particles)
+        for particles in self.find_chunks():
+            # Filled a chunk at a time, which draws the same numbers as drawing every position at once
+            self.rng.random(dtype=self.dtype, out=self.positions[particles])
+
+            # High enough to satisfy exit criteria initially, low enough to not trigger particle high velocity exception
+            self.velocities[particles] = 1 - 0.1
+
+    def create_array(self, shape, dtype=None):
+        """
+        Creates a zero filled array stored the same way as the swarm's arrays, of the swarm's dtype by default
+        """
+        return create_array(shape, self.dtype if dtype is None else dtype, self.storage_directory)
+
+    def find_chunks(self):
+        """
+        Yields slices of at most self.chunk_size particles covering the swarm in order
+        """
+        return find_chunks(self.num_particles, self.chunk_size)
+
+    def calculate_raw_positions(self, particles=slice(None)):
+        """
+        Parameters
+        ----------
+        particles: slice or index array of the particles to convert, all of them by default
+
+        Returns
+        -------
+        (num_particles, num_dimensions) size np.ndarray of np.doubles containing the position of each particle in the
+            units of the problem.  Always np.double, since the forcing function may need the precision
+        """
+        return self.positions[particles] * self.normalization_m + self.normalization_b
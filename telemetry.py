@@ -0,0 +1,205 @@
+import json
+import os
+import sys
+import numpy as np
+from math_functions import find_hypotenuse
+
+
+# Fields written for every recorded iteration, in order
+telemetry_fields = ("iteration", "best_score", "most_movement", "mean_r_squared", "sigma", "local_radius_limit",
+                    "velocity_coefficient", "high_particle_velocity_counter")
+
+# First line of a binary telemetry file, followed by a line of JSON describing the record dtype
+binary_magic = b"PSO-TELEMETRY-1\n"
+
+
+def create_record_dtype(num_particles=None, score_dtype=np.double):
+    """
+    Parameters
+    ----------
+    num_particles: int containing the number of particles when full score dumps are included, otherwise None
+    score_dtype: np.dtype of the full score dumps, the dtype of the swarm's scores
+
+    Returns
+    -------
+    np.dtype of one binary telemetry record
+    """
+    fields = [(field, np.int64 if field in ("iteration", "high_particle_velocity_counter") else np.double)
+              for field in telemetry_fields]
+    if num_particles is not None:
+        fields.append(("scores", score_dtype, (num_particles,)))
+    return np.dtype(fields)
+
+
+class TelemetryRecorder:
+    """
+    Writes one compact record per sampled iteration of an optimization run, either as JSON Lines or as fixed size
+    binary records.  Records are held in a buffer and written buffer_size at a time, so recording an iteration only
+    costs copying a few numbers.  The scores of every particle are only included when include_scores is set.
+    """
+
+    def __init__(self, num_particles, sink=None, telemetry_format="jsonl", interval=1, buffer_size=None,
+                 include_scores=False, score_dtype=np.double, resume_iteration=None):
+        """
+        self.sink_name: file name records are written to, or None for stdout.  With resume_iteration set, as when a run
+            is resumed from a checkpoint, records are added to an existing file after dropping any it has from
+            resume_iteration on, so the file ends up as if the run had never been interrupted
+
+        self.telemetry_format: str either "jsonl" or "binary"
+
+        self.interval: int, every interval-th iteration is recorded
+
+        self.buffer_size: int containing the number of records held before they are written.  Defaults to 1 for
+            stdout, so progress can be watched, and 64 for a file
+
+        self.include_scores: bool, True to add the score of every particle to each record, stored as score_dtype
+
+        self.buffer: (buffer_size) size structured np.ndarray of records waiting to be written
+
+        self.num_buffered: int containing the number of records in self.buffer
+        """
+        if telemetry_format not in ("jsonl", "binary"):
+            raise ValueError("Unknown telemetry format: " + str(telemetry_format))
+        self.sink_name = sink
+        self.telemetry_format = telemetry_format
+        self.interval = interval
+        self.buffer_size = buffer_size if buffer_size is not None else (1 if sink is None else 64)
+        self.include_scores = include_scores
+        self.buffer = np.zeros(self.buffer_size, dtype=create_record_dtype(num_particles if include_scores else None,
+                                                                         score_dtype))
+        self.num_buffered = 0
+        append = resume_iteration is not None and sink is not None and os.path.isfile(sink) and \
+            os.path.getsize(sink) > 0
+        if sink is None:
+            self.sink = sys.stdout.buffer if telemetry_format == "binary" else sys.stdout
+        elif append:
+            record_dtype = self.buffer.dtype if telemetry_format == "binary" else None
+            os.truncate(sink, find_resume_size(sink, record_dtype, resume_iteration))
+            self.sink = open(sink, "ab" if telemetry_format == "binary" else "a")
+        else:
+            self.sink = open(sink, "wb" if telemetry_format == "binary" else "w")
+        if telemetry_format == "binary" and not append:
+            self.sink.write(binary_magic)
+            self.sink.write((json.dumps(self.buffer.dtype.descr) + "\n").encode())
+
+    @classmethod
+    def from_arguments(cls, num_particles, optimization_arguments, score_dtype=np.double, resume_iteration=None):
+        """
+        Creates a recorder from the optional telemetry_* keys of the optimization arguments from InputHandling.
+        """
+        return cls(num_particles,
+                   optimization_arguments.get('telemetry_file'),
+                   optimization_arguments.get('telemetry_format', "jsonl"),
+                   optimization_arguments.get('telemetry_interval', 1),
+                   optimization_arguments.get('telemetry_buffer_size'),
+                   optimization_arguments.get('telemetry_scores', False),
+                   score_dtype,
+                   resume_iteration)
+
+    def record(self, particle_swarm, iteration, mean_r_squared):
+        """
+        Adds a record of the swarm at the end of iteration to the buffer if iteration is sampled, writing the buffer out
+        when it is full.
+        """
+        if iteration % self.interval != 0:
+            return
+
+        record = self.buffer[self.num_buffered]
+        record["iteration"] = iteration
+        record["best_score"] = particle_swarm.best_particle.score
+        record["most_movement"] = find_hypotenuse(particle_swarm.fastest_particle.velocity)
+        record["mean_r_squared"] = mean_r_squared
+        record["sigma"] = particle_swarm.sigma
+        record["local_radius_limit"] = particle_swarm.local_radius_limit
+        record["velocity_coefficient"] = particle_swarm.velocity_coefficient
+        record["high_particle_velocity_counter"] = particle_swarm.high_particle_velocity_counter
+        if self.include_scores:
+            record["scores"] = particle_swarm.state.scores
+        self.num_buffered += 1
+        if self.num_buffered == self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        records = self.buffer[:self.num_buffered]
+        if self.telemetry_format == "binary":
+            self.sink.write(records.tobytes())
+        else:
+            columns = [records[name].tolist() for name in records.dtype.names]
+            self.sink.write("".join(json.dumps(dict(zip(records.dtype.names, record))) + "\n"
+                                    for record in zip(*columns)))
+        self.sink.flush()
+        self.num_buffered = 0
+
+    def close(self):
+        """
+        Writes out any buffered records and closes the sink, unless it is stdout.
+        """
+        self.flush()
+        if self.sink_name is not None:
+            self.sink.close()
+
+
+def read_record_dtype(telemetry_file):
+    """
+    Reads the header of a binary telemetry file opened in binary mode, leaving telemetry_file at the first record
+
+    Returns
+    -------
+    np.dtype of the records, or None if telemetry_file is not a binary telemetry file
+    """
+    if telemetry_file.read(len(binary_magic)) != binary_magic:
+        return None
+    return np.dtype([tuple(field) for field in json.loads(telemetry_file.readline())])
+
+
+def find_resume_size(file_name, record_dtype, resume_iteration):
+    """
+    Parameters
+    ----------
+    file_name: str containing a telemetry file
+    record_dtype: np.dtype of the records for a binary telemetry file, or None for JSON Lines
+    resume_iteration: int containing the first iteration the resumed run records
+
+    Returns
+    -------
+    int containing the size file_name is cut to so that it only keeps the complete records from before
+        resume_iteration.  Raises ValueError if a binary file does not hold records of record_dtype
+    """
+    with open(file_name, "rb") as telemetry_file:
+        if record_dtype is not None:
+            if read_record_dtype(telemetry_file) != record_dtype:
+                raise ValueError("Cannot append to " + str(file_name) + ", it is not a binary telemetry file with the "
+                                 "same record fields.")
+            size = telemetry_file.tell()
+            while len(record := telemetry_file.read(record_dtype.itemsize)) == record_dtype.itemsize and \
+                    np.frombuffer(record, dtype=record_dtype)["iteration"][0] < resume_iteration:
+                size += record_dtype.itemsize
+            return size
+
+        size = 0
+        for line in telemetry_file:
+            if not line.endswith(b"\n") or json.loads(line)["iteration"] >= resume_iteration:
+                break
+            size += len(line)
+        return size
+
+
+def read_telemetry(file_name):
+    """
+    Reads a telemetry file written by TelemetryRecorder in either format.
+
+    Returns
+    -------
+    structured np.ndarray with one element per record, fields named as in telemetry_fields plus scores if included
+    """
+    with open(file_name, "rb") as telemetry_file:
+        record_dtype = read_record_dtype(telemetry_file)
+        if record_dtype is not None:
+            return np.frombuffer(telemetry_file.read(), dtype=record_dtype)
+
+        telemetry_file.seek(0)
+        records = [json.loads(line) for line in telemetry_file if line.strip()]
+
+    num_particles = len(records[0]["scores"]) if records and "scores" in records[0] else None
+    record_dtype = create_record_dtype(num_particles)
+    return np.array([tuple(record[name] for name in record_dtype.names) for record in records], dtype=record_dtype)
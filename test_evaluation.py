@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+from evaluation import EvaluationError, ForcingFunctionEvaluator
+from forcing_function import forcing_function
+from simulation_server import SimulationClient, SimulationServer
+
+
+class CountingClient(SimulationClient):
+    """
+    SimulationClient which counts its calls and the most calls in flight at once, and fails its first num_failures
+    calls with a dropped connection
+    """
+
+    def __init__(self, host, port, num_failures=0):
+        super().__init__(host, port)
+        self.num_failures = num_failures
+        self.num_calls = 0
+        self.in_flight = 0
+        self.most_in_flight = 0
+
+    async def __call__(self, raw_position):
+        self.num_calls += 1
+        if self.num_calls <= self.num_failures:
+            raise ConnectionResetError("Simulated dropped connection.")
+
+        self.in_flight += 1
+        self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        try:
+            return await super().__call__(raw_position)
+        finally:
+            self.in_flight -= 1
+
+
+def create_server(latency=0.0):
+    server = SimulationServer(latency=latency)
+    server.start()
+    return server
+
+
+def create_evaluator(client, **evaluation_arguments):
+    evaluator = ForcingFunctionEvaluator(client, evaluation_executor="async", **evaluation_arguments)
+    evaluator.retry_delay = 0.001
+    return evaluator
+
+
+@pytest.fixture
+def raw_positions():
+    return np.random.default_rng(0).uniform(1, 10, (40, 2))
+
+
+def test_async_matches_serial(raw_positions):
+    server = create_server()
+    evaluator = create_evaluator(SimulationClient(server.host, server.port))
+    try:
+        scores = evaluator.evaluate(raw_positions)
+    finally:
+        evaluator.shutdown()
+        server.stop()
+
+    serial_scores = ForcingFunctionEvaluator(forcing_function, "per_particle").evaluate(raw_positions)
+    assert np.array_equal(scores, serial_scores)
+    assert server.requests_served == len(raw_positions)
+
+
+def test_async_concurrency_is_bounded(raw_positions):
+    server = create_server(latency=0.01)
+    client = CountingClient(server.host, server.port)
+    evaluator = create_evaluator(client, evaluation_concurrency=4)
+    try:
+        evaluator.evaluate(raw_positions)
+    finally:
+        evaluator.shutdown()
+        server.stop()
+
+    assert client.most_in_flight == 4
+
+
+def test_async_timeout_raises_after_retries(raw_positions):
+    server = create_server(latency=1.0)
+    client = CountingClient(server.host, server.port)
+    evaluator = create_evaluator(client, evaluation_timeout=0.05, evaluation_retries=2)
+    try:
+        with pytest.raises(EvaluationError):
+            evaluator.evaluate(raw_positions[:1])
+    finally:
+        evaluator.shutdown()
+        server.stop()
+
+    assert client.num_calls == 3
+    assert server.requests_served == 0
+
+
+def test_async_transient_failure_is_retried(raw_positions):
+    server = create_server()
+    client = CountingClient(server.host, server.port, num_failures=1)
+    evaluator = create_evaluator(client, evaluation_retries=1)
+    try:
+        scores = evaluator.evaluate(raw_positions[:1])
+    finally:
+        evaluator.shutdown()
+        server.stop()
+
+    assert client.num_calls == 2
+    assert scores[0] == forcing_function(raw_positions[0])
@@ -0,0 +1,20 @@
+import json
+import os
+import numpy as np
+import pytest
+from check_kernels import check_kernels, check_optimization
+
+kernels_c = pytest.importorskip("kernels_c", reason="compiled kernels are not built, run "
+                                                    "`python setup.py build_ext --inplace`")
+
+
+@pytest.mark.parametrize("num_dimensions", [2, 3, 5])
+@pytest.mark.parametrize("float_type, tolerance", [(np.double, 1e-9), (np.single, 1e-4)])
+def test_kernels_match(num_dimensions, float_type, tolerance):
+    assert check_kernels(kernels_c, 500, num_dimensions, 0.1, 0, float_type, tolerance)
+
+
+def test_optimization_matches():
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "arguments")) as arguments_file:
+        config = dict(json.load(arguments_file), seed=0, iteration_limit=10)
+    assert check_optimization(config, 1e-6)
@@ -0,0 +1,141 @@
+import json
+import os
+import numpy as np
+
+
+# First line of a trajectory file, followed by a line of JSON describing the run
+trajectory_magic = b"PSO-TRAJECTORY-1\n"
+
+
+def create_snapshot_dtype(num_recorded_particles, num_dimensions):
+    """
+    Returns
+    -------
+    np.dtype of one snapshot: the iteration, the raw position of the best particle, and the raw positions of the
+        recorded particles in single precision
+    """
+    return np.dtype([("iteration", np.int64),
+                     ("best_position", np.double, (num_dimensions,)),
+                     ("positions", np.float32, (num_recorded_particles, num_dimensions))])
+
+
+class TrajectoryRecorder:
+    """
+    Appends snapshots of particle positions to a trajectory file during a run, for render_trajectory.py to draw after
+    the run.  Only every interval-th iteration is recorded, and only every stride-th particle when the swarm has more
+    than max_particles, so the file stays small.  Writes go through a large file buffer, so recording never waits on
+    the disk and never touches matplotlib.
+    """
+
+    # Bytes of snapshots held in memory before they are written to the file
+    write_buffer_size = 2 ** 20
+
+    def __init__(self, file_name, limits, num_particles, interval=10, max_particles=1000, resume_iteration=None):
+        """
+        self.file_name: str containing the trajectory file written to.  With resume_iteration set, as when a run is
+            resumed from a checkpoint, snapshots are added to an existing file after dropping any it has from
+            resume_iteration on, so the file ends up as if the run had never been interrupted
+
+        self.interval: int, every interval-th iteration is recorded
+
+        self.stride: int, every stride-th particle is recorded
+
+        self.snapshot: one element np.ndarray of create_snapshot_dtype reused for every snapshot
+
+        self.last_iteration: int containing the last iteration recorded, or None
+        """
+        self.file_name = file_name
+        self.interval = int(interval)
+        self.stride = int(np.ceil(num_particles / max_particles)) if num_particles > max_particles else 1
+        num_recorded_particles = len(range(0, num_particles, self.stride))
+        self.snapshot = np.zeros(1, dtype=create_snapshot_dtype(num_recorded_particles, len(limits)))
+        self.last_iteration = None
+        header = trajectory_magic + (json.dumps({
+            "limits": np.asarray(limits, dtype=np.double).tolist(),
+            "num_particles": int(num_particles),
+            "num_recorded_particles": num_recorded_particles,
+            "stride": self.stride,
+            "interval": self.interval,
+        }) + "\n").encode()
+        if resume_iteration is not None and os.path.isfile(file_name) and os.path.getsize(file_name) > 0:
+            os.truncate(file_name, find_resume_size(file_name, header, self.snapshot.dtype, resume_iteration))
+            self.trajectory_file = open(file_name, "ab", buffering=self.write_buffer_size)
+        else:
+            self.trajectory_file = open(file_name, "wb", buffering=self.write_buffer_size)
+            self.trajectory_file.write(header)
+
+    @classmethod
+    def from_arguments(cls, particle_swarm, optimization_arguments, resume_iteration=None):
+        """
+        Creates a recorder from the optional trajectory_* keys of the optimization arguments from InputHandling, or
+        returns None if there is no trajectory_file.
+        """
+        if 'trajectory_file' not in optimization_arguments:
+            return None
+        return cls(optimization_arguments['trajectory_file'],
+                   particle_swarm.limits,
+                   len(particle_swarm),
+                   optimization_arguments.get('trajectory_interval', 10),
+                   optimization_arguments.get('trajectory_max_particles', 1000),
+                   resume_iteration)
+
+    def record(self, particle_swarm, iteration, force=False):
+        """
+        Appends a snapshot of the swarm if iteration is a recorded iteration, or always if force is set.
+        """
+        if iteration == self.last_iteration or (not force and iteration % self.interval != 0):
+            return
+
+        state = particle_swarm.state
+        self.snapshot["iteration"] = iteration
+        self.snapshot["best_position"] = particle_swarm.best_particle.calculate_raw_position()
+        self.snapshot["positions"] = state.positions[::self.stride] * state.normalization_m + state.normalization_b
+        self.trajectory_file.write(self.snapshot.tobytes())
+        self.last_iteration = iteration
+
+    def close(self, particle_swarm, iteration):
+        """
+        Records the final positions of the swarm and closes the file.
+        """
+        self.record(particle_swarm, iteration, force=True)
+        self.trajectory_file.close()
+
+
+def find_resume_size(file_name, header, snapshot_dtype, resume_iteration):
+    """
+    Returns
+    -------
+    int containing the size file_name is cut to so that it only keeps the complete snapshots from before
+        resume_iteration.  Raises ValueError if the file was not recorded with header
+    """
+    with open(file_name, "rb") as trajectory_file:
+        if trajectory_file.read(len(header)) != header:
+            raise ValueError(file_name + " is not a trajectory file of the same run, so it cannot be resumed.")
+    num_snapshots = (os.path.getsize(file_name) - len(header)) // snapshot_dtype.itemsize
+    if num_snapshots == 0:
+        return len(header)
+    snapshots = np.memmap(file_name, dtype=snapshot_dtype, mode="r", offset=len(header), shape=num_snapshots)
+    num_kept = int(np.count_nonzero(snapshots["iteration"] < resume_iteration))
+    del snapshots
+    return len(header) + num_kept * snapshot_dtype.itemsize
+
+
+def read_trajectory(file_name):
+    """
+    Returns
+    -------
+    header: dictionary describing the run, as written by TrajectoryRecorder
+    snapshots: structured np.ndarray of create_snapshot_dtype with one element per snapshot
+    """
+    with open(file_name, "rb") as trajectory_file:
+        if trajectory_file.read(len(trajectory_magic)) != trajectory_magic:
+            raise ValueError(file_name + " is not a trajectory file.")
+        header = json.loads(trajectory_file.readline())
+        snapshot_dtype = create_snapshot_dtype(header["num_recorded_particles"], len(header["limits"]))
+        data = trajectory_file.read()
+
+    # A run that was killed can leave a partly written snapshot at the end, which is dropped
+    num_snapshots = len(data) // snapshot_dtype.itemsize
+    snapshots = np.frombuffer(data[:num_snapshots * snapshot_dtype.itemsize], dtype=snapshot_dtype)
+
+    return header, snapshots